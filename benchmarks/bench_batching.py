@@ -0,0 +1,51 @@
+"""Бенчмарк пакетных запросов: запросы, токены и секунды на 100 принятых продуктов.
+
+Токены на локальной заглушке оцениваются грубо (символы / 4), важна их относительная величина.
+Запуск: python benchmarks/bench_batching.py [--latency 0.3] [--categories 24]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import creator
+from metrics import Metrics
+from stub_openai import start_stub_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.3, help='задержка ответа заглушки, сек')
+    parser.add_argument('--categories', type=int, default=24, help='количество категорий в прогоне')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(latency=args.latency)
+    creator.API_BASE_URL = base_url
+    creator.CATEGORIES = creator.CATEGORIES[:args.categories]
+
+    print(f"{'пакет':>6} {'записей':>8} {'запросов/100':>13} {'токенов промпта/100':>20} {'сек/100':>8}")
+    for batch_size in args.sizes:
+        metrics = Metrics()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            data = creator.generate_full_database("stub-key", target_count=10 ** 6, concurrency=args.concurrency,
+                                                  rate=100.0, batch_size=batch_size, metrics=metrics,
+                                                  adaptive=False)
+        elapsed = time.perf_counter() - start
+        per_100 = 100 / len(data)
+        requests_count = metrics.counter("creator_requests_total")
+        prompt_tokens = metrics.counter("creator_tokens_total", direction="prompt")
+        print(f"{batch_size:>6} {len(data):>8} {requests_count * per_100:>13.2f} "
+              f"{prompt_tokens * per_100:>20.0f} {elapsed * per_100:>8.2f}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
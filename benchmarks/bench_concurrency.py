@@ -0,0 +1,51 @@
+"""Бенчмарк: время генерации базы при последовательных и параллельных запросах категорий.
+
+Запуск: python benchmarks/bench_concurrency.py [--latency 0.5] [--categories 24]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import creator
+from stub_openai import start_stub_server
+
+
+def run(concurrency, categories, rate):
+    """Один прогон generate_full_database; возвращает (секунды, количество записей)"""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        data = creator.generate_full_database("stub-key", target_count=10 ** 6,
+                                              concurrency=concurrency, rate=rate, adaptive=False)
+    return time.perf_counter() - start, len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.5, help='задержка ответа заглушки, сек')
+    parser.add_argument('--categories', type=int, default=24, help='количество категорий в прогоне')
+    parser.add_argument('--rate', type=float, default=100.0, help='лимит запросов в секунду')
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(latency=args.latency)
+    creator.API_BASE_URL = base_url
+    creator.CATEGORIES = creator.CATEGORIES[:args.categories]
+
+    print(f"Заглушка: {base_url}, задержка {args.latency} с, категорий {len(creator.CATEGORIES)}")
+    print(f"{'потоков':>8} {'сек':>8} {'записей':>8} {'ускорение':>10}")
+    baseline = None
+    for level in args.levels:
+        elapsed, count = run(level, creator.CATEGORIES, args.rate)
+        baseline = baseline or elapsed
+        print(f"{level:>8} {elapsed:>8.2f} {count:>8} {baseline / elapsed:>9.1f}x")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
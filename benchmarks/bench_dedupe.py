@@ -0,0 +1,67 @@
+"""Бенчмарк поиска почти-дубликатов: индекс MinHash/LSH против линейного перебора.
+
+Запуск: python benchmarks/bench_dedupe.py [--catalog 100000] [--queries 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dedupe import NearDuplicateIndex, jaccard, normalize_title, trigrams
+
+BASES = ["суп", "салат", "котлеты", "пирог", "каша", "рагу", "запеканка", "омлет", "паста", "плов",
+         "соус", "блины", "сырники", "рулет", "жаркое", "чизкейк", "хачапури", "манты", "лагман", "борщ"]
+WORDS = ["куриный", "грибной", "овощной", "томатный", "сливочный", "рыбный", "творожный", "яблочный",
+         "гороховый", "тыквенный", "мясной", "сырный", "ореховый", "ягодный", "рисовый", "гречневый",
+         "домашний", "деревенский", "острый", "пряный", "запеченный", "тушеный", "жареный", "отварной",
+         "с зеленью", "с луком", "с чесноком", "с грибами", "со сметаной", "с сыром", "с медом", "с изюмом"]
+
+
+def make_titles(count, seed=1):
+    """Синтетические уникальные названия блюд"""
+    rng = random.Random(seed)
+    titles = set()
+    while len(titles) < count:
+        words = rng.sample(WORDS, rng.randint(2, 4))
+        titles.add(f"{rng.choice(BASES).capitalize()} {' '.join(words)} №{rng.randint(1, 10 ** 6)}")
+    return list(titles)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--catalog', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--linear-queries', type=int, default=20, help='запросов для линейного перебора')
+    args = parser.parse_args()
+
+    titles = make_titles(args.catalog)
+    queries = make_titles(args.queries, seed=2)
+
+    index = NearDuplicateIndex()
+    start = time.perf_counter()
+    for title in titles:
+        index.add(title)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for title in queries:
+        index.find(title)
+    indexed = (time.perf_counter() - start) / len(queries)
+
+    shingles = [trigrams(normalize_title(title)) for title in titles]
+    start = time.perf_counter()
+    for title in queries[:args.linear_queries]:
+        grams = trigrams(normalize_title(title))
+        max(jaccard(grams, other) for other in shingles)
+    linear = (time.perf_counter() - start) / args.linear_queries
+
+    print(f"Каталог: {args.catalog} названий, построение индекса {build:.1f} с")
+    print(f"Индекс MinHash/LSH: {indexed * 1e6:.0f} мкс на запрос")
+    print(f"Линейный перебор:   {linear * 1e6:.0f} мкс на запрос ({linear / indexed:.0f}x медленнее)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Сравнение food_database.json и компактного бинарного формата: размер, загрузка, поиск.
+
+Запуск: python benchmarks/bench_export.py [--synthetic 100000]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from export import HEADER, SECTION, CompactDatabase, export_compact, search_key
+from json_stream import write_json_array
+
+INDEX_SECTIONS = {"PREFIX", "TRIKEYOF", "TRIKEYS", "POSTOFF", "POSTINGS"}
+
+
+def section_sizes(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    _, _, count = HEADER.unpack_from(data, 0)
+    sizes = {}
+    for i in range(count):
+        name, _, length = SECTION.unpack_from(data, HEADER.size + i * SECTION.size)
+        sizes[name.rstrip(b"\0").decode('ascii')] = length
+    return sizes
+
+
+def timed(func, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def compare(json_path, bin_path, queries):
+    export_start = time.perf_counter()
+    with open(json_path, 'r', encoding='utf-8') as f:
+        export_compact(json.load(f), bin_path)
+    export_time = time.perf_counter() - export_start
+
+    sizes = section_sizes(bin_path)
+    index_size = sum(v for k, v in sizes.items() if k in INDEX_SECTIONS)
+    json_size, bin_size = os.path.getsize(json_path), os.path.getsize(bin_path)
+    print(f"  Размер JSON: {json_size / 1024:.0f} КБ; бинарный: {bin_size / 1024:.0f} КБ "
+          f"(данные {(bin_size - index_size) / 1024:.0f} КБ + индекс {index_size / 1024:.0f} КБ), "
+          f"экспорт {export_time:.2f} с")
+
+    def load_json():
+        with open(json_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    json_load, data = timed(load_json)
+    bin_load, db = timed(lambda: CompactDatabase(bin_path))
+    print(f"  Загрузка: json.load {json_load * 1000:.1f} мс, mmap {bin_load * 1000:.3f} мс")
+
+    def scan_prefix():
+        return [[r["Title"] for r in data if search_key(r["Title"]).startswith(search_key(q))] for q in queries]
+
+    def scan_substring():
+        return [[r["Title"] for r in data if search_key(q) in search_key(r["Title"])] for q in queries]
+
+    per_query = 1e6 / len(queries)
+    scan_p, _ = timed(scan_prefix, 1)
+    index_p, _ = timed(lambda: [db.search_prefix(q) for q in queries], 1)
+    scan_s, _ = timed(scan_substring, 1)
+    index_s, _ = timed(lambda: [db.search(q) for q in queries], 1)
+    print(f"  Префикс:   перебор {scan_p * per_query:.0f} мкс, индекс {index_p * per_query:.0f} мкс на запрос")
+    print(f"  Подстрока: перебор {scan_s * per_query:.0f} мкс, индекс {index_s * per_query:.0f} мкс на запрос")
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--synthetic', type=int, default=100000, help='размер синтетической базы')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(ROOT, "food_database.json")
+        with open(source, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+        queries = ["салат", "суп", "сыр", "цезарь", "борщ", "каша", "курица", "чай"]
+        print(f"food_database.json ({len(records)} записей):")
+        compare(source, os.path.join(directory, "food.bin"), queries)
+
+        rng = random.Random(1)
+        synthetic = [dict(rng.choice(records), Title=f"{rng.choice(records)['Title']} {i}")
+                     for i in range(args.synthetic)]
+        synthetic_path = os.path.join(directory, "synthetic.json")
+        with open(synthetic_path, 'w', encoding='utf-8') as f:
+            write_json_array(synthetic, f)
+        print(f"Синтетическая база ({args.synthetic} записей):")
+        compare(synthetic_path, os.path.join(directory, "synthetic.bin"), queries)
+
+
+if __name__ == "__main__":
+    main()
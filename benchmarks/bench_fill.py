@@ -0,0 +1,51 @@
+"""Бенчмарк добора до цели: записей и запросов с дозапросами и без них.
+
+Заглушка ограничивает ассортимент каждой категории (--pool), поэтому дозапросы
+со списком "не повторяй" сначала дают новые продукты, а затем их выход падает.
+Запуск: python benchmarks/bench_fill.py [--latency 0.1] [--categories 12] [--target 600]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import creator
+from metrics import Metrics
+from stub_openai import start_stub_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.1, help='задержка ответа заглушки, сек')
+    parser.add_argument('--categories', type=int, default=12, help='количество категорий в прогоне')
+    parser.add_argument('--pool', type=int, default=30, help='минимальный ассортимент категории в заглушке')
+    parser.add_argument('--target', type=int, default=600, help='целевое количество записей')
+    parser.add_argument('--concurrency', type=int, default=4)
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(latency=args.latency, pool_size=args.pool)
+    creator.API_BASE_URL = base_url
+    creator.CATEGORIES = creator.CATEGORIES[:args.categories]
+
+    print(f"{'режим':>12} {'записей':>8} {'цель':>6} {'запросов':>9} {'дозапросов':>11} {'сек':>6}")
+    for adaptive in (False, True):
+        metrics = Metrics()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            data = creator.generate_full_database("stub-key", target_count=args.target,
+                                                  concurrency=args.concurrency, rate=100.0,
+                                                  metrics=metrics, adaptive=adaptive)
+        elapsed = time.perf_counter() - start
+        follow_ups = metrics.counter("creator_requests_total") - args.categories
+        print(f"{'адаптивный' if adaptive else 'один проход':>12} {len(data):>8} {args.target:>6} "
+              f"{metrics.counter('creator_requests_total'):>9} {follow_ups:>11} {elapsed:>6.2f}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Бенчмарк пула ключей: пропускная способность в зависимости от числа ключей и отказоустойчивость.
+
+Заглушка ограничивает каждый ключ --key-rate запросами в секунду (сверх лимита — 429 с Retry-After).
+Последний сценарий добавляет к ключам недоступный эндпоинт: его должен отключить circuit breaker.
+Запуск: python benchmarks/bench_keys.py [--key-rate 4] [--keys 1 2 4 8]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import creator
+from metrics import Metrics
+from stub_openai import start_stub_server
+
+
+def run(keys, rate, args):
+    """Один прогон генерации; возвращает (записей, секунд, метрики, строки статистики ключей)"""
+    metrics = Metrics()
+    pool = creator.get_pool(",".join(keys), rate)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        data = creator.generate_full_database(pool, target_count=10 ** 6, concurrency=args.concurrency,
+                                              rate=rate, metrics=metrics, adaptive=False)
+    return len(data), time.perf_counter() - start, metrics, pool.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.1, help='задержка ответа заглушки, сек')
+    parser.add_argument('--key-rate', type=float, default=4.0, help='лимит заглушки на ключ, запр./сек')
+    parser.add_argument('--keys', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--categories', type=int, default=48)
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(latency=args.latency, key_rate=args.key_rate)
+    creator.API_BASE_URL = base_url
+    creator.CATEGORIES = [f"категория {i}" for i in range(args.categories)]
+    creator.RETRY_DELAY = 0.1
+
+    print(f"Лимит заглушки: {args.key_rate} запр./сек на ключ, категорий: {args.categories}")
+    print(f"{'ключей':>7} {'лимит пула':>11} {'записей':>8} {'сек':>6} {'зап/сек':>8} {'запр/сек':>9} {'429':>5}")
+    scenarios = [(n, args.key_rate) for n in args.keys] + [(args.keys[-1], args.key_rate * 2)]
+    for count, rate in scenarios:
+        keys = [f"stub-key-{count}-{rate}-{i}" for i in range(count)]
+        throttled = server.throttled
+        records, elapsed, metrics, _ = run(keys, rate, args)
+        print(f"{count:>7} {rate:>11.1f} {records:>8} {elapsed:>6.2f} {records / elapsed:>8.0f} "
+              f"{metrics.counter('creator_requests_total') / elapsed:>9.1f} {server.throttled - throttled:>5}")
+
+    # Отказ эндпоинта: запросы на недоступный адрес отключают его, остальные ключи продолжают работу
+    keys = [f"stub-key-failover-{i}" for i in range(2)] + ["dead-key@http://127.0.0.1:9/v1"]
+    records, elapsed, metrics, summary = run(keys, args.key_rate, args)
+    print(f"\nС недоступным эндпоинтом: {records} записей за {elapsed:.2f} с, "
+          f"ошибок запросов: {metrics.counter('creator_requests_total', outcome='error')}")
+    for line in summary:
+        print(f"  {line}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Бенчмарк чтения базы: json.load + срезы против потокового iter_food_data (JSON и JSONL).
+
+Каждый замер выполняется в отдельном процессе, пиковая память — ru_maxrss процесса.
+Запуск: python benchmarks/bench_loader.py [--sizes 100000 1000000]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BATCH_SIZE = 100
+
+
+def make_record(i):
+    return {
+        "Title": f"Синтетический продукт {i}",
+        "Calories": str(50 + i % 500),
+        "Protein": i % 30,
+        "Fat": i % 20,
+        "Carbohydrates": i % 60,
+        "dateload": 1748552400,
+        "shared": False,
+    }
+
+
+def write_files(directory, size):
+    """Синтетические файлы: JSON-массив в формате creator.py (indent=2) и JSONL"""
+    json_path = os.path.join(directory, f"food_{size}.json")
+    jsonl_path = os.path.join(directory, f"food_{size}.jsonl")
+    with open(json_path, 'w', encoding='utf-8') as f:
+        f.write("[")
+        for i in range(size):
+            text = json.dumps(make_record(i), ensure_ascii=False, indent=2).replace("\n", "\n  ")
+            f.write(("," if i else "") + "\n  " + text)
+        f.write("\n]")
+    with open(jsonl_path, 'w', encoding='utf-8') as f:
+        for i in range(size):
+            f.write(json.dumps(make_record(i), ensure_ascii=False) + "\n")
+    return json_path, jsonl_path
+
+
+def worker(mode, path):
+    """Чтение файла и разбиение на пакеты так, как это делает upload_to_firestore"""
+    sys.path.insert(0, ROOT)
+    import loader
+
+    start = time.perf_counter()
+    batches = records = 0
+    if mode == "json.load":
+        data = loader.load_food_data(path)
+        for i in range(0, len(data), BATCH_SIZE):
+            batch = data[i:i + BATCH_SIZE]
+            batches += 1
+            records += len(batch)
+    else:
+        for batch in loader.iter_batches(loader.iter_food_data(path), BATCH_SIZE):
+            batches += 1
+            records += len(batch)
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"records": records, "seconds": elapsed, "peak_mb": peak_mb}))
+
+
+def baseline_rss():
+    """Пиковая память процесса, который только импортирует loader"""
+    code = f"import sys, resource; sys.path.insert(0, {ROOT!r}); import loader; " \
+           "print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)"
+    return float(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True).stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--worker', nargs=2, metavar=('MODE', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        return worker(*args.worker)
+
+    with tempfile.TemporaryDirectory() as directory:
+        # loader пишет firebase_loader.log в текущий каталог — уводим его во временный
+        os.chdir(directory)
+        print(f"Базовая память процесса с импортом loader: {baseline_rss():.0f} МБ")
+        print(f"{'записей':>9} {'режим':>12} {'размер МБ':>10} {'сек':>7} {'зап/сек':>10} {'пик МБ':>8}")
+        for size in args.sizes:
+            json_path, jsonl_path = write_files(directory, size)
+            for mode, path in (("json.load", json_path), ("stream", json_path), ("stream", jsonl_path)):
+                out = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", mode, path],
+                                     capture_output=True, text=True, check=True).stdout
+                result = json.loads(out.strip().splitlines()[-1])
+                label = mode if path == json_path else "stream jsonl"
+                print(f"{size:>9} {label:>12} {os.path.getsize(path) / 2 ** 20:>10.1f} "
+                      f"{result['seconds']:>7.2f} {result['records'] / result['seconds']:>10.0f} "
+                      f"{result['peak_mb']:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
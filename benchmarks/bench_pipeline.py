@@ -0,0 +1,140 @@
+"""Сквозной офлайн-бенчмарк конвейера: generate_full_database -> JSON -> upload_to_firestore.
+
+Вместо aitunnel используется локальная заглушка chat.completions (задержка, доля ошибок
+HTTP 500 и обрезанных JSON-ответов), вместо Firestore — MemorySink. Для каждого размера
+базы каждый этап выполняется в отдельном процессе; выводятся записи/сек, p50/p99 задержки
+запросов (генерация) и коммитов (загрузка) и пиковая память процесса.
+Запуск: python benchmarks/bench_pipeline.py [--sizes 300 1500 6000] [--error-rate 0.02]
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, q):
+    """Квантиль по рангу (без интерполяции)"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))]
+
+
+def event_seconds(path, kind):
+    """Длительности событий kind из файла событий метрик"""
+    with open(path, encoding='utf-8') as f:
+        return [event["seconds"] for event in map(json.loads, f) if event["event"] == kind]
+
+
+def peak_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def generate_worker(size, output, args):
+    """Генерация size записей через заглушку; результат — JSON-файл output"""
+    import creator
+    from journal import Journal, write_json_from_journal
+    from metrics import Metrics
+    from stub_openai import start_stub_server
+
+    server, base_url = start_stub_server(latency=args.latency, pool_size=30, error_rate=args.error_rate,
+                                         malformed_rate=args.malformed_rate, seed=size)
+    creator.API_BASE_URL = base_url
+    creator.RETRY_DELAY = 0.2
+    # По 15 продуктов за первый запрос; недобор из-за сбоев закрывают дозапросы
+    creator.CATEGORIES = [f"категория {i}" for i in range(math.ceil(size / 15))]
+
+    metrics = Metrics("generate_events.jsonl")
+    journal = Journal("generate.jsonl")
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        data = creator.generate_full_database("stub-key", target_count=size, concurrency=args.concurrency,
+                                              rate=1000.0, journal=journal, metrics=metrics)
+    elapsed = time.perf_counter() - start
+    journal.close()
+    metrics.close()
+    server.shutdown()
+    write_json_from_journal("generate.jsonl", output)
+
+    latencies = event_seconds("generate_events.jsonl", "request")
+    return {"records": len(data), "seconds": elapsed, "p50": percentile(latencies, 0.5),
+            "p99": percentile(latencies, 0.99), "peak_mb": peak_mb(),
+            "extra": f"запросов {server.requests}, ошибок {server.errors}, обрезано {server.malformed}"}
+
+
+def upload_worker(size, path, args):
+    """Потоковая загрузка JSON-файла path в MemorySink"""
+    import logging
+    import loader
+    from metrics import Metrics
+    from sinks import MemorySink
+    logging.getLogger('FirebaseLoader').setLevel(logging.ERROR)
+
+    sink = MemorySink(latency=args.commit_latency, error_rate=args.commit_error_rate, seed=size)
+    metrics = Metrics("upload_events.jsonl")
+    start = time.perf_counter()
+    written = loader.upload_to_firestore('menu', loader.iter_food_data(path), sink=sink, metrics=metrics)
+    elapsed = time.perf_counter() - start
+    metrics.close()
+
+    latencies = event_seconds("upload_events.jsonl", "commit")
+    return {"records": written, "seconds": elapsed, "p50": percentile(latencies, 0.5),
+            "p99": percentile(latencies, 0.99), "peak_mb": peak_mb(),
+            "extra": f"коммитов {sink.commits}, документов {len(sink.documents)}"}
+
+
+def run_stage(stage, size, path, argv):
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", stage, str(size), path] + argv,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[300, 1500, 6000])
+    parser.add_argument('--latency', type=float, default=0.05, help='задержка ответа заглушки, сек')
+    parser.add_argument('--error-rate', type=float, default=0.02, help='доля ответов HTTP 500')
+    parser.add_argument('--malformed-rate', type=float, default=0.02, help='доля ответов с обрезанным JSON')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--commit-latency', type=float, default=0.02, help='имитируемое время коммита, сек')
+    parser.add_argument('--commit-error-rate', type=float, default=0.01, help='доля коммитов с ошибкой')
+    parser.add_argument('--worker', nargs=3, metavar=('STAGE', 'SIZE', 'PATH'), help=argparse.SUPPRESS)
+    args, _ = parser.parse_known_args()
+
+    if args.worker:
+        stage, size, path = args.worker
+        worker = generate_worker if stage == "generate" else upload_worker
+        result = worker(int(size), path, args)
+        print(json.dumps(result, ensure_ascii=False))
+        return
+
+    argv = sys.argv[1:]
+    with tempfile.TemporaryDirectory() as directory:
+        # Журнал, события метрик и firebase_loader.log пишутся во временный каталог
+        os.chdir(directory)
+        print(f"Заглушка: задержка {args.latency} с, ошибок {args.error_rate:.0%}, "
+              f"обрезанных ответов {args.malformed_rate:.0%}; коммит {args.commit_latency} с")
+        print(f"{'размер':>7} {'этап':>9} {'записей':>8} {'сек':>7} {'зап/сек':>9} {'p50 мс':>8} "
+              f"{'p99 мс':>8} {'пик МБ':>7}  подробности")
+        for size in args.sizes:
+            path = os.path.join(directory, f"food_{size}.json")
+            for stage in ("generate", "upload"):
+                result = run_stage(stage, size, path, argv)
+                print(f"{size:>7} {stage:>9} {result['records']:>8} {result['seconds']:>7.2f} "
+                      f"{result['records'] / result['seconds']:>9.0f} {result['p50'] * 1000:>8.1f} "
+                      f"{result['p99'] * 1000:>8.1f} {result['peak_mb']:>7.0f}  {result['extra']}")
+
+
+if __name__ == "__main__":
+    main()
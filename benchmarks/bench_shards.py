@@ -0,0 +1,90 @@
+"""Бенчмарк генерации шардами: один процесс против N процессов-шардов со слиянием результатов.
+
+Каждый шард — отдельный процесс со своим журналом и своей заглушкой API (как у отдельной
+машины); задержка заглушки мала, поэтому узким местом становится разбор, нормализация и
+проверка ответов в одном интерпретаторе. После генерации журналы шардов сливаются merge_shards.
+Запуск: python benchmarks/bench_shards.py [--workers 1 2 4] [--categories 240]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def shard_worker(index, count, args):
+    """Генерация шарда index из count в журнал шарда"""
+    import creator
+    from journal import Journal
+    from stub_openai import start_stub_server
+
+    server, base_url = start_stub_server(latency=args.latency, seed=index)
+    creator.API_BASE_URL = base_url
+    categories = [f"категория {i}" for i in range(args.categories)]
+    journal = Journal(creator.shard_path("food.jsonl", index, count))
+    with contextlib.redirect_stdout(io.StringIO()):
+        data = creator.generate_full_database("stub-key", target_count=10 ** 6, concurrency=args.concurrency,
+                                              rate=1000.0, journal=journal, adaptive=False,
+                                              categories=creator.shard_categories(categories, index, count))
+    journal.close()
+    server.shutdown()
+    return {"records": len(data)}
+
+
+def run(count, argv):
+    """Запуск count шардов параллельно и слияние; возвращает (сгенерировано, записано, дубликатов, секунд...)"""
+    from creator import shard_path
+    from merge import merge_shards
+
+    start = time.perf_counter()
+    processes = [subprocess.Popen([sys.executable, os.path.abspath(__file__), "--worker", str(index), str(count)]
+                                  + argv, stdout=subprocess.PIPE, text=True) for index in range(count)]
+    generated = sum(json.loads(process.communicate()[0].strip().splitlines()[-1])["records"]
+                    for process in processes)
+    generate_seconds = time.perf_counter() - start
+
+    conflicts = []
+    start = time.perf_counter()
+    written = merge_shards([shard_path("food.jsonl", index, count) for index in range(count)], "food.json",
+                           on_conflict=lambda record, size: conflicts.append(size))
+    merge_seconds = time.perf_counter() - start
+    return generated, written, sum(conflicts) - len(conflicts), generate_seconds, merge_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--categories', type=int, default=240)
+    parser.add_argument('--latency', type=float, default=0.005, help='задержка ответа заглушки, сек')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--worker', nargs=2, type=int, metavar=('INDEX', 'COUNT'), help=argparse.SUPPRESS)
+    args, _ = parser.parse_known_args()
+
+    if args.worker:
+        print(json.dumps(shard_worker(*args.worker, args)))
+        return
+
+    argv = sys.argv[1:]
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        print(f"Категорий {args.categories}, задержка заглушки {args.latency} с, ядер {os.cpu_count()}")
+        print(f"{'шардов':>7} {'получено':>9} {'записано':>9} {'слито':>6} {'генерация с':>12} "
+              f"{'зап/сек':>8} {'слияние с':>10}")
+        for count in args.workers:
+            generated, written, merged, generate_seconds, merge_seconds = run(count, argv)
+            print(f"{count:>7} {generated:>9} {written:>9} {merged:>6} {generate_seconds:>12.2f} "
+                  f"{generated / generate_seconds:>8.0f} {merge_seconds:>10.2f}")
+        print(f"Пик памяти процесса слияния: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} МБ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Бенчмарк потокового разбора ответов: время до первого принятого продукта и уцелевшие продукты.
+
+Заглушка обрывает часть ответов на середине (--malformed-rate), как при исчерпании max_tokens.
+Запуск: python benchmarks/bench_streaming.py [--latency 1.0] [--malformed-rate 0.2]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import creator
+from metrics import Metrics
+from stub_openai import start_stub_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=1.0, help='полное время ответа заглушки, сек')
+    parser.add_argument('--malformed-rate', type=float, default=0.2, help='доля оборванных ответов')
+    parser.add_argument('--categories', type=int, default=16, help='количество категорий в прогоне')
+    parser.add_argument('--concurrency', type=int, default=4)
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(latency=args.latency, malformed_rate=args.malformed_rate, seed=1)
+    creator.API_BASE_URL = base_url
+    creator.CATEGORIES = creator.CATEGORIES[:args.categories]
+
+    print(f"{'режим':>9} {'записей':>8} {'до 1-го, с':>11} {'сек':>6} {'оборвано':>9} {'спасено':>8} "
+          f"{'ошибок разбора':>15}")
+    for stream in (False, True):
+        creator.STREAM = stream
+        server.random.seed(1)
+        metrics = Metrics()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            data = creator.generate_full_database("stub-key", target_count=10 ** 6, concurrency=args.concurrency,
+                                                  rate=100.0, metrics=metrics, adaptive=False)
+        elapsed = time.perf_counter() - start
+        print(f"{'поток' if stream else 'целиком':>9} {len(data):>8} "
+              f"{metrics.merged('creator_first_item_seconds').sum:>11.2f} {elapsed:>6.2f} "
+              f"{metrics.counter('creator_truncated_responses_total'):>9} "
+              f"{metrics.counter('creator_salvaged_items_total'):>8} "
+              f"{metrics.counter('creator_parse_failures_total'):>15}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
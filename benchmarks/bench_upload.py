@@ -0,0 +1,49 @@
+"""Бенчмарк пропускной способности upload_to_firestore на приемнике в памяти (документов/сек).
+
+Запуск: python benchmarks/bench_upload.py [--records 50000] [--latency 0.05] [--error-rate 0.02]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def make_records(count):
+    return [
+        {"Title": f"Синтетический продукт {i}", "Calories": str(50 + i % 500), "Protein": i % 30,
+         "Fat": i % 20, "Carbohydrates": i % 60, "dateload": 1748552400, "shared": False}
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=50000)
+    parser.add_argument('--latency', type=float, default=0.05, help='имитируемое время коммита, сек')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='доля коммитов с ошибкой конкуренции')
+    args = parser.parse_args()
+
+    # loader пишет firebase_loader.log в текущий каталог — уводим его во временный
+    os.chdir(tempfile.mkdtemp())
+    import loader
+    from sinks import MemorySink
+    logging.getLogger('FirebaseLoader').setLevel(logging.ERROR)
+
+    print(f"Документов: {args.records}, задержка коммита {args.latency} с, ошибок {args.error_rate:.0%}")
+    print(f"{'пакет':>6} {'в полете':>9} {'сек':>8} {'док/сек':>10} {'записано':>9}")
+    for batch_size, in_flight in ((100, 1), (500, 1), (500, 4), (500, 8), (500, 16)):
+        sink = MemorySink(latency=args.latency, error_rate=args.error_rate, seed=1)
+        start = time.perf_counter()
+        written = loader.upload_to_firestore('menu', make_records(args.records), sink=sink,
+                                             batch_size=batch_size, max_in_flight=in_flight)
+        elapsed = time.perf_counter() - start
+        print(f"{batch_size:>6} {in_flight:>9} {elapsed:>8.2f} {written / elapsed:>10.0f} {len(sink.documents):>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Бенчмарк векторизованной проверки пищевой ценности на синтетических данных.
+
+Запуск: python benchmarks/bench_validate.py [--sizes 100000 1000000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from validate import load_columns, validate_columns
+
+
+def make_pairs(count, seed=1):
+    """Синтетические (категория, запись) с долей физически невозможных строк"""
+    rng = random.Random(seed)
+    for i in range(count):
+        protein, fat, carbs = (round(rng.uniform(0, 30), 1) for _ in range(3))
+        calories = 4 * protein + 9 * fat + 4 * carbs
+        if rng.random() < 0.05:
+            calories *= rng.uniform(0.2, 3)
+        yield f"категория {i % 70}", {"Title": f"Продукт {i}", "Calories": str(round(calories)),
+                                      "Protein": protein, "Fat": fat, "Carbohydrates": carbs}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000])
+    args = parser.parse_args()
+
+    print(f"{'записей':>9} {'загрузка, с':>12} {'проверка, с':>12} {'помечено':>9}")
+    for size in args.sizes:
+        pairs = list(make_pairs(size))
+        start = time.perf_counter()
+        codes, _, columns = load_columns(pairs)
+        loaded = time.perf_counter() - start
+        start = time.perf_counter()
+        flags, _ = validate_columns(codes, columns)
+        checked = time.perf_counter() - start
+        print(f"{size:>9} {loaded:>12.2f} {checked:>12.2f} {int((flags != 0).sum()):>9}")
+
+
+if __name__ == "__main__":
+    main()
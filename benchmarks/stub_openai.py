@@ -0,0 +1,203 @@
+"""Локальная заглушка OpenAI-совместимого эндпоинта /v1/chat/completions для бенчмарков"""
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_products(category, count):
+    """Формирование правдоподобного списка продуктов для категории.
+
+    БЖУ детерминированы по категории и номеру, калорийность сходится с 4·Б + 9·Ж + 4·У
+    с разбросом до 5%, как в таблицах калорийности.
+    """
+    products = []
+    for i in range(count):
+        rng = random.Random(f"{category}/{i}")
+        protein = round(rng.uniform(0.5, 30.0), 1)
+        fat = round(rng.choice((rng.uniform(0.1, 3.0), rng.uniform(3.0, 35.0))), 1)
+        carbohydrates = round(rng.uniform(0.0, min(75.0, 98.0 - protein - fat)), 1)
+        energy = 4 * protein + 9 * fat + 4 * carbohydrates
+        products.append({
+            "Title": f"{category} — продукт {i + 1}",
+            "Calories": round(energy * rng.uniform(0.95, 1.05)),
+            "Protein": protein,
+            "Fat": fat,
+            "Carbohydrates": carbohydrates,
+        })
+    return products
+
+
+def pool_products(category, count, pool_size=None, exclude=()):
+    """Продукты категории с учетом конечного ассортимента и списка "не повторяй".
+
+    При pool_size у категории pool_size..2*pool_size-1 продуктов (детерминированно
+    по названию); уже исключенные не возвращаются, поэтому выход дозапросов падает.
+    """
+    if pool_size is None:
+        return make_products(category, count)
+    size = pool_size + zlib.crc32(category.encode('utf-8')) % pool_size
+    exclude = set(exclude)
+    fresh = [item for item in make_products(category, size) if item["Title"] not in exclude]
+    return fresh[:count]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Обработчик запросов chat.completions с искусственной задержкой и сбоями"""
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        prompt = request.get('messages', [{}])[-1].get('content', '')
+
+        key = self.headers.get('Authorization', '').removeprefix('Bearer ')
+        wait = self.server.throttle(key)
+        if wait:
+            # Превышен лимит ключа: 429 с Retry-After, как у OpenAI-совместимых API
+            return self.send_json(429, {"error": {"message": "stub: rate limit", "type": "rate_limit_error"}},
+                                  {"Retry-After": f"{wait:.3f}", "retry-after-ms": str(int(wait * 1000))})
+        failure, malformed = self.server.roll()
+        stream = request.get('stream', False)
+        # При потоковом ответе первый фрагмент приходит через 20% задержки, остальное — равномерно
+        time.sleep(self.server.latency * (0.2 if stream and not failure else 1.0))
+        if failure:
+            return self.send_json(500, {"error": {"message": "stub: internal error", "type": "server_error"}})
+
+        batch = re.search(r"приведи (\d+) примеров.*?Категории:\n((?:- .+\n)+)", prompt, re.S)
+        if batch:
+            # Пакетный запрос: JSON-объект {категория: [продукты]}
+            count = int(batch.group(1))
+            categories = [line[2:] for line in batch.group(2).splitlines()]
+            payload = {category: pool_products(category, count, self.server.pool_size) for category in categories}
+        else:
+            match = re.search(r"Приведи (\d+) примеров .*?категории '([^']+)'", prompt)
+            count, category = (int(match.group(1)), match.group(2)) if match else (15, "неизвестно")
+            exclude = re.search(r"Не повторяй: (.+)$", prompt, re.S)
+            exclude = exclude.group(1).split("; ") if exclude else ()
+            payload = pool_products(category, count, self.server.pool_size, exclude)
+
+        content = json.dumps(payload, ensure_ascii=False)
+        if malformed:
+            # Обрыв ответа на середине, как при исчерпании max_tokens
+            content = content[:len(content) // 2]
+        elif request.get('response_format', {}).get('type') != 'json_object':
+            content = "```json\n" + content + "\n```"
+        if stream:
+            return self.send_stream(request, prompt, content, "length" if malformed else "stop")
+        self.send_json(200, {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get('model', 'stub'),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "length" if malformed else "stop",
+            }],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(prompt) + len(content)) // 4},
+        })
+
+    def send_stream(self, request, prompt, content, finish_reason, piece=40):
+        """Ответ в формате server-sent events, как chat.completions с stream=True"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        pieces = [content[i:i + piece] for i in range(0, len(content), piece)] or [""]
+        delay = self.server.latency * 0.8 / len(pieces)
+        base = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                "model": request.get('model', 'stub')}
+        chunks = [dict(base, choices=[{"index": 0, "delta": {"content": text}, "finish_reason": None}])
+                  for text in pieces]
+        chunks.append(dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": finish_reason}]))
+        if request.get('stream_options', {}).get('include_usage'):
+            chunks.append(dict(base, choices=[], usage={
+                "prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                "total_tokens": (len(prompt) + len(content)) // 4}))
+        for i, chunk in enumerate(chunks):
+            if i < len(pieces):
+                time.sleep(delay)
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    """HTTP-сервер заглушки с общими настройками задержки и доли сбоев"""
+
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.5, pool_size=None, error_rate=0.0, malformed_rate=0.0, seed=None,
+                 key_rate=None):
+        super().__init__(address, StubHandler)
+        self.key_rate = key_rate
+        self.key_tokens = {}
+        self.throttled = 0
+        self.latency = latency
+        self.pool_size = pool_size
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.malformed = 0
+
+    def throttle(self, key, burst=2):
+        """Лимит key_rate запросов в секунду на ключ (token bucket с запасом burst).
+
+        Возвращает, сколько ждать до следующего разрешенного запроса (0 — запрос разрешен).
+        """
+        if not self.key_rate:
+            return 0.0
+        with self.lock:
+            now = time.monotonic()
+            tokens, updated = self.key_tokens.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * self.key_rate)
+            if tokens < 1:
+                self.key_tokens[key] = (tokens, now)
+                self.throttled += 1
+                return (1 - tokens) / self.key_rate
+            self.key_tokens[key] = (tokens - 1, now)
+            return 0.0
+
+    def roll(self):
+        """Выбор исхода запроса: (ошибка HTTP 500, обрезанный JSON)"""
+        with self.lock:
+            self.requests += 1
+            failure = self.random.random() < self.error_rate
+            malformed = not failure and self.random.random() < self.malformed_rate
+            self.errors += failure
+            self.malformed += malformed
+        return failure, malformed
+
+
+def start_stub_server(latency=0.5, host='127.0.0.1', port=0, pool_size=None, error_rate=0.0, malformed_rate=0.0,
+                      seed=None, key_rate=None):
+    """Запуск заглушки в фоновом потоке; возвращает (server, base_url).
+
+    pool_size ограничивает ассортимент каждой категории (см. pool_products), error_rate —
+    доля ответов HTTP 500, malformed_rate — доля ответов с обрезанным JSON, key_rate —
+    лимит запросов в секунду на ключ (сверх него — 429 с Retry-After).
+    """
+    server = StubServer((host, port), latency, pool_size, error_rate, malformed_rate, seed, key_rate)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://{host}:{server.server_address[1]}/v1"
+    return server, base_url
@@ -0,0 +1,37 @@
+"""Единая точка входа для всех этапов работы с базой продуктов.
+
+Запуск: python cli.py <команда> [параметры], справка по команде — python cli.py <команда> --help.
+Модуль команды импортируется только после выбора команды, поэтому тяжелые зависимости
+(openai, firebase_admin, numpy) загружает лишь та команда, которой они нужны.
+"""
+import argparse
+import importlib
+import sys
+
+# команда: (модуль с функцией main(argv, prog), описание)
+COMMANDS = {
+    "generate": ("creator", "генерация базы продуктов через модель"),
+    "validate": ("validate", "проверка и исправление пищевой ценности"),
+    "dedupe": ("dedupe", "удаление почти одинаковых продуктов"),
+    "merge": ("merge", "слияние результатов шардов генерации"),
+    "export": ("export", "экспорт в компактный бинарный формат"),
+    "upload": ("loader", "загрузка или синхронизация с Firestore"),
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Инструменты базы продуктов",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="команды:\n" + "\n".join(f"  {name:<10} {text}" for name, (_, text) in COMMANDS.items()),
+    )
+    parser.add_argument('command', choices=COMMANDS, metavar='команда', help="одна из команд ниже")
+    parser.add_argument('args', nargs=argparse.REMAINDER, help="параметры команды")
+    args = parser.parse_args(argv)
+
+    module = importlib.import_module(COMMANDS[args.command][0])
+    return module.main(args.args, prog=f"{parser.prog} {args.command}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
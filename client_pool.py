@@ -0,0 +1,182 @@
+"""Пул долгоживущих клиентов OpenAI-совместимого API по нескольким ключам и эндпоинтам.
+
+Ключи задаются строкой через запятую; у ключа можно указать свой эндпоинт: "ключ@https://host/v1".
+Для каждого ключа создается один клиент SDK (соединения переиспользуются keep-alive),
+ведется свой лимит частоты, учет ошибок и автомат отключения (circuit breaker).
+"""
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+FAILURE_THRESHOLD = 3  # Ошибок подряд, после которых ключ временно отключается
+COOLDOWN = 30.0  # Пауза отключенного ключа до пробного запроса, сек
+MAX_COOLDOWN = 300.0
+
+
+def parse_endpoints(spec, default_base_url):
+    """Список пар (ключ, base_url) из строки "k1,k2@url" или списка таких элементов"""
+    items = spec.split(",") if isinstance(spec, str) else spec
+    endpoints = []
+    for item in items:
+        item = item.strip()
+        if not item:
+            continue
+        key, _, base_url = item.partition("@")
+        endpoints.append((key, base_url or default_base_url))
+    if not endpoints:
+        raise ValueError("Не задано ни одного API-ключа")
+    return endpoints
+
+
+def retry_after(error):
+    """Пауза из заголовков Retry-After / retry-after-ms ответа с ошибкой, сек (или None)"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    if headers.get('retry-after-ms'):
+        try:
+            return float(headers['retry-after-ms']) / 1000
+        except ValueError:
+            pass
+    value = headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class Endpoint:
+    """Ключ API с собственным клиентом, лимитом частоты и статистикой ошибок"""
+
+    def __init__(self, key, base_url):
+        self.key = key
+        self.base_url = base_url
+        self.name = f"{urlparse(base_url).netloc}/…{key[-4:]}"
+        self.client = None
+        self.next_free = 0.0  # Время, с которого ключ может принять следующий запрос
+        self.open_until = 0.0  # Время окончания отключения
+        self.state = "closed"  # closed — работает, open — отключен, half_open — идет пробный запрос
+        self.failures = 0  # Ошибок подряд
+        self.opens = 0
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self.error_rate = 0.0  # Экспоненциальное среднее доли ошибок
+
+
+class ClientPool:
+    """Потокобезопасный пул ключей: выбор наименее загруженного ключа, лимиты и отключение сбойных.
+
+    acquire() возвращает Endpoint с готовым клиентом (при необходимости дожидаясь свободного
+    слота по лимиту rate запросов в секунду на ключ), release() сообщает результат запроса.
+    Ответ с Retry-After (например, 429) блокирует ключ на указанное время, FAILURE_THRESHOLD
+    ошибок подряд отключают ключ на COOLDOWN (удваивается при повторных отключениях),
+    после чего через него проходит один пробный запрос.
+    """
+
+    def __init__(self, endpoints, rate=1.0, failure_threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN,
+                 max_cooldown=MAX_COOLDOWN, timeout=60):
+        self.endpoints = [Endpoint(key, base_url) for key, base_url in endpoints]
+        self.rate = rate
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.timeout = timeout
+        self.lock = threading.Lock()
+
+    @property
+    def size(self):
+        return len(self.endpoints)
+
+    def _client(self, endpoint):
+        # SDK импортируется при первом запросе; клиент (и его пул соединений) живет вместе с пулом
+        if endpoint.client is None:
+            from openai import OpenAI
+            # Повторы выполняет вызывающий код через пул, чтобы сбойный ключ можно было сменить
+            endpoint.client = OpenAI(api_key=endpoint.key, base_url=endpoint.base_url, max_retries=0,
+                                     timeout=self.timeout)
+        return endpoint.client
+
+    def acquire(self):
+        """Выбор ключа для запроса; блокирует поток до освобождения слота по лимиту"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                available = [e for e in self.endpoints
+                             if e.state == "closed" or (e.state == "open" and e.open_until <= now)]
+                if available:
+                    endpoint = min(available, key=lambda e: (max(e.next_free, now), e.error_rate, e.in_flight))
+                    if endpoint.state == "open":
+                        endpoint.state = "half_open"
+                    start = max(endpoint.next_free, now)
+                    endpoint.next_free = start + 1 / self.rate
+                    endpoint.in_flight += 1
+                    self._client(endpoint)
+                    wait = start - now
+                else:
+                    # Все ключи отключены или идут пробные запросы: ждем ближайшего включения
+                    endpoint = None
+                    wait = min((e.open_until for e in self.endpoints if e.state == "open"), default=now + 0.1) - now
+            if wait > 0:
+                time.sleep(wait)
+            if endpoint is not None:
+                return endpoint
+
+    def release(self, endpoint, error=None):
+        """Учет результата запроса через endpoint; error — исключение или None при успехе.
+
+        Возвращает True, если ключ ответил ограничением частоты (Retry-After): такой запрос
+        можно сразу повторить — пул направит его на другой ключ или дождется освобождения этого.
+        """
+        with self.lock:
+            now = time.monotonic()
+            endpoint.in_flight -= 1
+            endpoint.requests += 1
+            endpoint.error_rate *= 0.9
+            if error is None:
+                if endpoint.state == "half_open":
+                    endpoint.opens = 0
+                endpoint.failures = 0
+                endpoint.state = "closed"
+                return False
+            endpoint.errors += 1
+            endpoint.error_rate += 0.1
+            pause = retry_after(error)
+            if pause is not None:
+                # Ключ исчерпал свой лимит: запросы уходят на другие ключи, пока он не освободится
+                endpoint.throttled += 1
+                endpoint.next_free = max(endpoint.next_free, now + pause)
+                if endpoint.state == "half_open":
+                    endpoint.state = "closed"
+                return True
+            endpoint.failures += 1
+            # Ошибки запросов, начатых до отключения ключа, не продлевают отключение
+            if endpoint.state == "half_open" or (endpoint.state == "closed"
+                                                 and endpoint.failures >= self.failure_threshold):
+                cooldown = min(self.max_cooldown, self.cooldown * 2 ** endpoint.opens)
+                endpoint.state = "open"
+                endpoint.open_until = now + cooldown
+                endpoint.opens += 1
+                print(f"Ключ {endpoint.name} отключен на {cooldown:.0f} с после {endpoint.failures} ошибок подряд")
+            return False
+
+    def summary(self):
+        """Строки статистики по ключам"""
+        with self.lock:
+            return [f"{e.name}: запросов {e.requests}, ошибок {e.errors}, ограничений частоты {e.throttled}, "
+                    f"отключений {e.opens}, состояние {e.state}" for e in self.endpoints]
+
+
+def backoff_delay(attempt, base=1.0, maximum=30.0):
+    """Экспоненциальная пауза перед повтором со случайным разбросом (full jitter)"""
+    return random.uniform(0, min(maximum, base * 2 ** attempt))
@@ -1,32 +1,275 @@
-import openai
+import argparse
 import json
+import math
 import time
 import os
-import requests
+import re
+import subprocess
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from queue import SimpleQueue
 from datetime import datetime
 from dotenv import load_dotenv
-from openai import OpenAI
+from client_pool import ClientPool, backoff_delay, parse_endpoints
+from dedupe import NearDuplicateIndex
+from export import export_compact
+from journal import DEFAULT_JOURNAL_FILE, Journal, write_json_from_journal
+from json_stream import ResponseItemParser, iter_json_array, parse_number
+from merge import merge_shards
+from metrics import Metrics
+from response_cache import DEFAULT_CACHE_FILE, ResponseCache, make_key
 
 # Загрузка переменных окружения из .env файла
 load_dotenv()
 
 # Конфигурация
-OPENAI_API_KEY = os.getenv('REACT_APP_OPENAI_API_KEY')  # Загружаем ключ из переменных окружения
+OPENAI_API_KEY = os.getenv('REACT_APP_OPENAI_API_KEY')  # Ключ или несколько через запятую ("ключ@base_url")
 OUTPUT_FILE = "food_database.json"
-TIMESTAMP = int(datetime(2025, 5, 30).timestamp())
+COMPACT_FILE = "food_database.bin"  # Компактный формат с поисковым индексом для приложения
+DATELOAD = "2025-05-30"  # Дата загрузки, записываемая в поле dateload
+TIMESTAMP = int(datetime.fromisoformat(DATELOAD).timestamp())
+TARGET_COUNT = 3000
 MODEL_NAME = "gpt-4o-mini-search-preview"  # Специальная модель для поиска фактов
+API_BASE_URL = "https://api.aitunnel.ru/v1"
+SYSTEM_PROMPT = "Ты помощник, который отвечает только в формате JSON."
+TEMPERATURE = 0.7
+MAX_TOKENS = 1000
+JSON_MODE = True  # Структурированный ответ (response_format=json_object) для пакетных запросов
+STREAM = True  # Потоковые ответы: продукты принимаются по мере поступления, оборванный хвост не губит ответ
+BATCH_SIZE = 1  # Количество категорий в одном запросе (1 — по запросу на категорию)
+MIN_FOLLOW_UP_YIELD = 3  # Категория выбывает, если дозапрос дал меньше новых продуктов
+MAX_REQUESTS_PER_CATEGORY = 10
+EXCLUDE_LIMIT = 60  # Сколько последних названий категории передавать в "не повторяй"
+RETRY_DELAY = 1.0  # Начальная пауза между повторами запроса (растет экспоненциально со случайным разбросом), сек
+RETRY_MAX_DELAY = 30.0
+MAX_ATTEMPTS = 3  # Попыток на запрос; каждая может уйти на другой ключ
+MAX_THROTTLED_RETRIES = 10  # Повторы после ответа с Retry-After, не расходующие попытки
+MAX_CONCURRENCY = 4  # Количество категорий, запрашиваемых одновременно
+REQUESTS_PER_SECOND = 1.0  # Ограничение частоты запросов к API на один ключ
 
-def get_real_food_data(api_key, category, count=100):
-    """Получение реальных данных о продуктах из указанной категории с использованием поисковой модели"""
+class TokenBucket:
+    """Ограничитель частоты запросов по алгоритму token bucket (потокобезопасный)"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Блокирует поток до появления свободного токена"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class YieldScheduler:
+    """Планировщик дозапросов: приоритет у категорий с наибольшим выходом новых уникальных продуктов.
+
+    Для каждой категории ведется оценка ожидаемого выхода (экспоненциальное среднее
+    числа новых продуктов на запрос) и список уже собранных названий для "не повторяй".
+    Категория выбывает, когда дозапрос дал меньше min_yield новых продуктов или
+    исчерпан лимит запросов на категорию.
+    """
+
+    def __init__(self, categories, initial_yield=15, min_yield=MIN_FOLLOW_UP_YIELD,
+                 max_requests=MAX_REQUESTS_PER_CATEGORY):
+        self.order = {category: i for i, category in enumerate(categories)}
+        self.expected = {category: float(initial_yield) for category in categories}
+        self.requests = {category: 0 for category in categories}
+        self.titles = {category: [] for category in categories}
+        self.retired = set()
+        self.min_yield = min_yield
+        self.max_requests = max_requests
+
+    def record(self, category, accepted_titles, follow_up=False):
+        """Учет результата запроса: сколько новых продуктов принято"""
+        accepted = len(accepted_titles)
+        self.titles[category].extend(accepted_titles)
+        self.requests[category] += 1
+        self.expected[category] = accepted if self.requests[category] == 1 else \
+            0.5 * self.expected[category] + 0.5 * accepted
+        if (follow_up and accepted < self.min_yield) or self.requests[category] >= self.max_requests:
+            self.retired.add(category)
+
+    def next_round(self, size):
+        """Следующие категории для дозапроса по убыванию ожидаемого выхода"""
+        active = [c for c in self.expected if c not in self.retired and self.expected[c] >= self.min_yield]
+        active.sort(key=lambda c: (-self.expected[c], self.order[c]))
+        return active[:size]
+
+# Описание полей и требований, общее для одиночных и пакетных запросов
+PRODUCT_FIELDS_PROMPT = (
+    "- Title: название на русском языке\n"
+    "- Calories: калорийность (ккал, число)\n"
+    "- Protein: белки (г, число с одной цифрой после запятой)\n"
+    "- Fat: жиры (г, число с одной цифрой после запятой)\n"
+    "- Carbohydrates: углеводы (г, число с одной цифрой после запятой)\n\n"
+    "Важно: \n"
+    "1. Указывай только реально существующие блюда и продукты\n"
+    "2. Для готовых блюд укажи полное название (например, 'Салат Цезарь с курицей')\n"
+    "3. Значения должны быть реалистичными и соответствовать официальным источникам\n"
+    "4. Не добавляй никаких комментариев вне JSON"
+)
+
+def report_costs(metrics, accepted, elapsed):
+    """Сводка затрат на запросы в пересчете на 100 принятых продуктов"""
+    per_100 = 100 / accepted if accepted else 0
+    requests_count = metrics.counter("creator_requests_total")
+    prompt_tokens = metrics.counter("creator_tokens_total", direction="prompt")
+    completion_tokens = metrics.counter("creator_tokens_total", direction="completion")
+    print(f"Запросов к API: {requests_count} (из кэша: {metrics.counter('creator_cache_hits_total')}), "
+          f"токенов: {prompt_tokens} на вход / {completion_tokens} на выход")
+    print(f"На 100 принятых продуктов: запросов {requests_count * per_100:.1f}, "
+          f"токенов промпта {prompt_tokens * per_100:.0f}, "
+          f"токенов ответа {completion_tokens * per_100:.0f}, секунд {elapsed * per_100:.1f}")
+
+def get_pool(api_key, rate=None):
+    """Пул клиентов для ключей api_key (строка "k1,k2@url" или список); rate — лимит на ключ.
+
+    Готовый ClientPool возвращается как есть (со своим лимитом и статистикой), поэтому
+    generate_full_database создает пул на запуск и передает его во все запросы.
+    """
+    if isinstance(api_key, ClientPool):
+        return api_key
+    return ClientPool(parse_endpoints(api_key, API_BASE_URL), rate or REQUESTS_PER_SECOND)
+
+def request_completion(api_key, messages, cache=None, limiter=None, metrics=None, max_tokens=MAX_TOKENS,
+                       response_format=None, label="", on_delta=None):
+    """Запрос к модели с кэшем и повторами.
+
+    Возвращает (content, cache_key); content равен None, если все попытки завершились ошибкой.
+    api_key — ключи или готовый ClientPool: каждая попытка уходит на наименее загруженный
+    исправный ключ, между попытками — экспоненциальная пауза со случайным разбросом.
+    label — категория (или описание пакета) для меток метрик. Если передан on_delta, ответ
+    запрашивается потоком (stream=True) и каждый фрагмент текста сразу передается в on_delta;
+    при обрыве потока возвращается полученная часть ответа без повторного запроса.
+    """
+    # SDK импортируется только при реальном обращении к API: офлайн-команды его не загружают
+    from openai import APITimeoutError
+    metrics = metrics if metrics is not None else Metrics()
+    cache_key = make_key(MODEL_NAME, messages, TEMPERATURE, max_tokens)
+    content = cache.get(cache_key) if cache is not None else None
+    
+    if content is not None:
+        metrics.inc("creator_cache_hits_total")
+        if on_delta is not None:
+            on_delta(content)
+        return content, cache_key
+    
+    pool = get_pool(api_key)
+    extra = {"response_format": response_format} if response_format else {}
+    if on_delta is not None:
+        extra.update(stream=True, stream_options={"include_usage": True})
+    
+    max_retries = MAX_ATTEMPTS
+    attempt = 0
+    throttled = 0
+    
+    while True:
+        outcome = "error"
+        endpoint = None
+        try:
+            # Лимит частоты расходуется только на реальные обращения к API, не на попадания в кэш
+            with metrics.timer("creator_rate_limit_wait_seconds"):
+                if limiter is not None:
+                    limiter.acquire()
+                endpoint = pool.acquire()
+            start_time = time.perf_counter()
+            parts = []
+            try:
+                response = endpoint.client.chat.completions.create(
+                    model=MODEL_NAME,
+                    messages=messages,
+                    temperature=TEMPERATURE,
+                    max_tokens=max_tokens,
+                    timeout=60,  # таймаут 60 секунд
+                    **extra
+                )
+                if on_delta is not None:
+                    usage = None
+                    for chunk in response:
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            if not parts:
+                                metrics.observe("creator_first_chunk_seconds", time.perf_counter() - start_time)
+                            parts.append(chunk.choices[0].delta.content)
+                            on_delta(parts[-1])
+                        usage = getattr(chunk, 'usage', None) or usage
+                outcome = "ok"
+            except APITimeoutError:
+                outcome = "timeout"
+                raise
+            except Exception:
+                if not parts:
+                    raise
+                # Поток оборвался на середине: уже переданные фрагменты не запрашиваем заново
+                outcome = "partial"
+            finally:
+                elapsed = time.perf_counter() - start_time
+                metrics.inc("creator_requests_total", outcome=outcome)
+                metrics.inc("creator_endpoint_requests_total", endpoint=endpoint.name, outcome=outcome)
+                metrics.observe("creator_request_seconds", elapsed, category=label)
+            if on_delta is None:
+                usage = getattr(response, 'usage', None)
+            prompt_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+            completion_tokens = getattr(usage, 'completion_tokens', 0) or 0
+            metrics.inc("creator_tokens_total", prompt_tokens, direction="prompt")
+            metrics.inc("creator_tokens_total", completion_tokens, direction="completion")
+            metrics.event("request", category=label, seconds=round(elapsed, 3), attempt=attempt + 1,
+                          endpoint=endpoint.name, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+            pool.release(endpoint)
+            break
+        except Exception as api_error:
+            if endpoint is not None and pool.release(endpoint, api_error) and throttled < MAX_THROTTLED_RETRIES:
+                # Лимит ключа: пул придержит его на время Retry-After, повтор уходит сразу
+                throttled += 1
+                metrics.inc("creator_throttled_total")
+                continue
+            print(f"Ошибка API [{label}] (попытка {attempt + 1}/{max_retries}): "
+                  f"{type(api_error).__name__}: {str(api_error)}")
+            metrics.event("request_error", category=label, attempt=attempt + 1, outcome=outcome,
+                          endpoint=endpoint.name if endpoint is not None else None,
+                          error=type(api_error).__name__)
+            if attempt == max_retries - 1:
+                print(f"Достигнуто максимальное количество попыток. Пропускаем: {label}")
+                return None, cache_key
+            # Ключ, ответивший Retry-After, пул сам придержит; здесь — общая пауза с разбросом
+            delay = backoff_delay(attempt, RETRY_DELAY, RETRY_MAX_DELAY)
+            metrics.inc("creator_retries_total")
+            metrics.inc("creator_retry_sleep_seconds_total", delay)
+            time.sleep(delay)
+            attempt += 1
+    
+    if on_delta is not None:
+        return "".join(parts), cache_key
+    return response.choices[0].message.content, cache_key
+
+def extract_json(content):
+    """Разбор JSON из ответа модели: из блока ```json ... ``` или всего текста"""
+    # Пытаемся найти JSON в тексте (внутри ```json ... ``` или ``` ... ```)
+    json_match = re.search(r'```(?:json\n)?([\s\S]*?)```', content)
+    json_str = json_match.group(1).strip() if json_match else content
+    return json.loads(json_str)
+
+def get_real_food_data(api_key, category, count=100, cache=None, limiter=None, metrics=None, exclude=None,
+                       on_item=None):
+    """Получение реальных данных о продуктах из указанной категории с использованием поисковой модели.
+
+    exclude — уже собранные названия категории, которые модель не должна повторять.
+    При STREAM ответ разбирается по мере поступления, и каждый готовый продукт сразу
+    передается в on_item; из оборванного ответа сохраняются продукты до места обрыва.
+    """
+    metrics = metrics if metrics is not None else Metrics()
     try:
-        print(f"Используемый API ключ: {api_key[:5]}...{api_key[-5:] if api_key else ''}")
-        print(f"Используемая модель: {MODEL_NAME}")
-        
-        client = OpenAI(
-            api_key=api_key,
-            base_url="https://api.aitunnel.ru/v1"  # Убрали слеш в конце
-        )
-        
         # Уменьшаем количество запрашиваемых продуктов для тестирования
         count = min(count, 15)  # Еще уменьшаем для теста
         
@@ -35,81 +278,49 @@ def get_real_food_data(api_key, category, count=100):
             f"Приведи {count} примеров продуктов/блюд из категории '{category}'. "
             f"Для каждого укажи точные данные о пищевой ценности на 100 грамм.\n"
             "Формат ответа: JSON-массив объектов с полями:\n"
-            "- Title: название на русском языке\n"
-            "- Calories: калорийность (ккал, число)\n"
-            "- Protein: белки (г, число с одной цифрой после запятой)\n"
-            "- Fat: жиры (г, число с одной цифрой после запятой)\n"
-            "- Carbohydrates: углеводы (г, число с одной цифрой после запятой)\n\n"
-            "Важно: \n"
-            "1. Указывай только реально существующие блюда и продукты\n"
-            "2. Для готовых блюд укажи полное название (например, 'Салат Цезарь с курицей')\n"
-            "3. Значения должны быть реалистичными и соответствовать официальным источникам\n"
-            "4. Не добавляй никаких комментариев вне JSON"
+            + PRODUCT_FIELDS_PROMPT
         )
+        if exclude:
+            prompt += "\n\nНе повторяй: " + "; ".join(exclude[-EXCLUDE_LIMIT:])
         
-        print(f"\n{'='*30} Отправка запроса API {'='*30}")
-        print(f"Категория: {category}")
-        print(f"Запрашиваемое количество: {count}")
-        print(f"API ключ: {api_key[:5]}...{api_key[-5:] if api_key else ''}")
-        print(f"Модель: {MODEL_NAME}")
-        print(f"Промпт: {prompt[:200]}..." if len(prompt) > 200 else f"Промпт: {prompt}")
-        
-        max_retries = 3
-        retry_delay = 5  # секунды
-        
-        for attempt in range(max_retries):
-            try:
-                start_time = time.time()
-                response = client.chat.completions.create(
-                    model=MODEL_NAME,
-                    messages=[
-                        {"role": "system", "content": "Ты помощник, который отвечает только в формате JSON."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.7,
-                    max_tokens=1000,
-                    timeout=60  # таймаут 60 секунд
-                )
-                print(f"Запрос выполнен за {time.time() - start_time:.2f} секунд")
-                break
-            except requests.Timeout:
-                print(f"Таймаут запроса (попытка {attempt + 1}/{max_retries})")
-                if attempt == max_retries - 1:
-                    print("Достигнуто максимальное количество попыток. Пропускаем категорию.")
-                    return []
-                time.sleep(retry_delay)
-            except Exception as api_error:
-                print(f"Ошибка API (попытка {attempt + 1}/{max_retries}): {str(api_error)}")
-                print(f"Тип ошибки: {type(api_error).__name__}")
-                if hasattr(api_error, 'response'):
-                    print(f"Ответ сервера: {api_error.response}")
-                if attempt == max_retries - 1:
-                    print("Достигнуто максимальное количество попыток. Пропускаем категорию.")
-                    return []
-                time.sleep(retry_delay)
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+        parser = ResponseItemParser()
+        streamed = []
         
-        print("Получен ответ от API")
-        content = response.choices[0].message.content
-        print(f"Сырой ответ: {content[:200]}...")  # Выводим начало ответа для отладки
+        def on_delta(text):
+            with metrics.timer("creator_parse_seconds"):
+                items = parser.feed(text)
+            for item in items:
+                if isinstance(item, dict):
+                    streamed.append(item)
+                    if on_item is not None:
+                        on_item(item)
         
-        # Используем регулярное выражение для извлечения JSON из текста
-        import re
-        
-        # Пытаемся найти JSON в тексте (внутри ```json ... ``` или ``` ... ```)
-        json_match = re.search(r'```(?:json\n)?([\s\S]*?)```', content)
-        if json_match:
-            json_str = json_match.group(1).strip()
-            print(f"Извлечен JSON из блока кода")
-        else:
-            # Если не нашли блок кода, пробуем обработать как есть
-            print("Блок кода не найден, обрабатываем как есть")
-            json_str = content
+        content, cache_key = request_completion(api_key, messages, cache, limiter, metrics, label=category,
+                                                on_delta=on_delta if STREAM else None)
+        if content is None:
+            return []
+        if not STREAM:
+            on_delta(content)
         
-        print(f"Очищенный ответ: {json_str[:200]}...")
+        if streamed:
+            if parser.finished:
+                # В кэш попадают только ответы, которые удалось разобрать целиком
+                if cache is not None:
+                    cache.put(cache_key, content)
+            else:
+                print(f"Ответ для категории {category} оборван, сохранено продуктов: {len(streamed)}")
+                metrics.inc("creator_truncated_responses_total")
+                metrics.inc("creator_salvaged_items_total", len(streamed))
+            return streamed
         
-        # Пытаемся распарсить JSON
+        # Массива в ответе нет: пробуем разобрать ответ целиком (например, одиночный объект)
         try:
-            data = json.loads(json_str)
+            with metrics.timer("creator_parse_seconds"):
+                data = extract_json(content)
             
             # Обрабатываем разные форматы ответа
             if isinstance(data, dict):
@@ -121,129 +332,375 @@ def get_real_food_data(api_key, category, count=100):
             elif isinstance(data, list):
                 items = data
             else:
-                print(f"Неожиданный формат ответа: {type(data)}")
+                print(f"Неожиданный формат ответа для категории {category}: {type(data)}")
+                metrics.inc("creator_parse_failures_total")
                 items = []
                 
-            print(f"Успешно распаршено {len(items)} элементов")
+            # В кэш попадают только ответы, которые удалось разобрать
+            if cache is not None and items:
+                cache.put(cache_key, content)
             return items
             
         except json.JSONDecodeError as je:
-            print(f"Ошибка парсинга JSON: {je}")
-            print(f"Строка с ошибкой: {json_str}")
+            print(f"Ошибка парсинга JSON для категории {category}: {je}")
+            metrics.inc("creator_parse_failures_total")
+            metrics.event("parse_failure", category=category, error=str(je), head=content[:200])
             return []
         
     except Exception as e:
         print(f"Ошибка при обработке категории {category}: {str(e)}")
         raise  # Пробрасываем исключение для обработки в вызывающем коде
 
-def generate_full_database(api_key, target_count=1500):
-    """Генерация полной базы данных продуктов"""
-    categories = [
-        # Основные категории продуктов
-        "овощи", "фрукты", "ягоды", "зелень", "грибы",
-        "мясо и птица", "рыба и морепродукты", "яйца",
-        "молочные продукты", "сыры", "творог и творожные продукты",
-        "крупы и злаки", "макаронные изделия", "хлеб и выпечка",
-        "орехи и семена", "бобовые",
-        
-        # Напитки
-        "свежевыжатые соки", "морсы и компоты", "минеральная вода и лимонады",
-        "чай и травяные настои", "кофе и какао напитки",
-        
-        # Русская кухня
-        "первые блюда русской кухни", "вторые блюда русской кухни", "салаты русской кухни",
-        "выпечка русской кухни", "десерты русской кухни",
-        
-        # Кавказская кухня
-        "первые блюда кавказской кухни", "вторые блюда кавказской кухни", "салаты кавказской кухни",
-        "выпечка кавказской кухни", "соусы кавказской кухни",
-        
-        # Европейская кухня
-        "первые блюда европейской кухни", "вторые блюда европейской кухни", "салаты европейской кухни",
-        "десерты европейской кухни", "соусы европейской кухни",
-        
-        # Азиатская кухня
-        "первые блюда азиатской кухни", "вторые блюда азиатской кухни", "салаты азиатской кухни",
-        "десерты азиатской кухни", "соусы азиатской кухни",
-        
-        # Итальянская кухня
-        "паста и ризотто итальянской кухни", "пицца и фокачча итальянской кухни",
-        "салаты и закуски итальянской кухни", "десерты итальянской кухни",
-        "соусы и заправки итальянской кухни",
-        
-        # Среднеазиатская кухня
-        "первые блюда среднеазиатской кухни", "вторые блюда среднеазиатской кухни",
-        "салаты и закуски среднеазиатской кухни", "выпечка среднеазиатской кухни",
-        "соусы и приправы среднеазиатской кухни",
-        
-        # Турецкая кухня
-        "первые блюда турецкой кухни", "вторые блюда турецкой кухни",
-        "салаты и мезе турецкой кухни", "выпечка турецкой кухни",
-        "десерты турецкой кухни", "напитки турецкой кухни",
-        
-        # Низкокалорийные варианты
-        "низкокалорийные завтраки", "низкокалорийные обеды", "низкокалорийные ужины",
-        "низкокалорийные десерты", "низкокалорийные перекусы",
-        
-        # Вегетарианские и веганские блюда
-        "вегетарианские первые блюда", "вегетарианские вторые блюда", "вегетарианские салаты",
-        "веганские блюда", "безглютеновые блюда"
+def get_batch_food_data(api_key, categories, count=15, cache=None, limiter=None, metrics=None, exclude=None):
+    """Получение продуктов сразу для нескольких категорий одним запросом.
+
+    Модель отвечает JSON-объектом {категория: [продукты]} в режиме JSON_MODE. Категории,
+    которых нет в ответе или которые не удалось разобрать, запрашиваются повторно
+    меньшими пакетами (вплоть до одиночных запросов). Если запрос не удался (исчерпаны
+    попытки), пакет не дробится: его категории остаются для дозапросов и --resume.
+    Возвращает {категория: продукты}.
+    exclude ({категория: названия}) передается только в одиночные запросы.
+    """
+    metrics = metrics if metrics is not None else Metrics()
+    if len(categories) == 1:
+        category = categories[0]
+        return {category: get_real_food_data(api_key, category, count, cache, limiter, metrics,
+                                             exclude=(exclude or {}).get(category))}
+    
+    count = min(count, 15)
+    category_list = "\n".join(f"- {category}" for category in categories)
+    prompt = (
+        f"Для каждой из перечисленных категорий приведи {count} примеров продуктов/блюд "
+        f"и укажи точные данные о пищевой ценности на 100 грамм.\n"
+        f"Категории:\n{category_list}\n\n"
+        "Формат ответа: JSON-объект, где ключ — название категории в точности как в списке, "
+        "а значение — массив объектов с полями:\n"
+        + PRODUCT_FIELDS_PROMPT
+    )
+    
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
     ]
+    content, cache_key = request_completion(
+        api_key, messages, cache, limiter, metrics, max_tokens=MAX_TOKENS * len(categories),
+        response_format={"type": "json_object"} if JSON_MODE else None, label=f"пакет из {len(categories)}"
+    )
+    
+    results = {}
+    if content is None:
+        # Сбой ключа или эндпоинта: дробление пакета только умножило бы число запросов
+        return results
+    try:
+        with metrics.timer("creator_parse_seconds"):
+            data = extract_json(content)
+    except json.JSONDecodeError as je:
+        print(f"Ошибка парсинга пакетного ответа: {je}")
+        metrics.event("parse_failure", category=", ".join(categories), error=str(je), head=content[:200])
+        data = None
+    if isinstance(data, dict):
+        for category in categories:
+            items = data.get(category)
+            if isinstance(items, list) and items:
+                results[category] = items
+    # Кэшируем только полностью разобранный ответ, иначе повтор должен уйти в сеть
+    if cache is not None and len(results) == len(categories):
+        cache.put(cache_key, content)
     
+    failed = [category for category in categories if category not in results]
+    if failed:
+        print(f"Не разобраны категории ({len(failed)}): {', '.join(failed)}. Повтор меньшими пакетами")
+        metrics.inc("creator_parse_failures_total", len(failed))
+        middle = (len(failed) + 1) // 2
+        for part in (failed[:middle], failed[middle:]):
+            if part:
+                results.update(get_batch_food_data(api_key, part, count, cache, limiter, metrics, exclude))
+    return results
+
+CATEGORIES = [
+    # Основные категории продуктов
+    "овощи", "фрукты", "ягоды", "зелень", "грибы",
+    "мясо и птица", "рыба и морепродукты", "яйца",
+    "молочные продукты", "сыры", "творог и творожные продукты",
+    "крупы и злаки", "макаронные изделия", "хлеб и выпечка",
+    "орехи и семена", "бобовые",
+    
+    # Напитки
+    "свежевыжатые соки", "морсы и компоты", "минеральная вода и лимонады",
+    "чай и травяные настои", "кофе и какао напитки",
+    
+    # Русская кухня
+    "первые блюда русской кухни", "вторые блюда русской кухни", "салаты русской кухни",
+    "выпечка русской кухни", "десерты русской кухни",
+    
+    # Кавказская кухня
+    "первые блюда кавказской кухни", "вторые блюда кавказской кухни", "салаты кавказской кухни",
+    "выпечка кавказской кухни", "соусы кавказской кухни",
+    
+    # Европейская кухня
+    "первые блюда европейской кухни", "вторые блюда европейской кухни", "салаты европейской кухни",
+    "десерты европейской кухни", "соусы европейской кухни",
+    
+    # Азиатская кухня
+    "первые блюда азиатской кухни", "вторые блюда азиатской кухни", "салаты азиатской кухни",
+    "десерты азиатской кухни", "соусы азиатской кухни",
+    
+    # Итальянская кухня
+    "паста и ризотто итальянской кухни", "пицца и фокачча итальянской кухни",
+    "салаты и закуски итальянской кухни", "десерты итальянской кухни",
+    "соусы и заправки итальянской кухни",
+    
+    # Среднеазиатская кухня
+    "первые блюда среднеазиатской кухни", "вторые блюда среднеазиатской кухни",
+    "салаты и закуски среднеазиатской кухни", "выпечка среднеазиатской кухни",
+    "соусы и приправы среднеазиатской кухни",
+    
+    # Турецкая кухня
+    "первые блюда турецкой кухни", "вторые блюда турецкой кухни",
+    "салаты и мезе турецкой кухни", "выпечка турецкой кухни",
+    "десерты турецкой кухни", "напитки турецкой кухни",
+    
+    # Низкокалорийные варианты
+    "низкокалорийные завтраки", "низкокалорийные обеды", "низкокалорийные ужины",
+    "низкокалорийные десерты", "низкокалорийные перекусы",
+    
+    # Вегетарианские и веганские блюда
+    "вегетарианские первые блюда", "вегетарианские вторые блюда", "вегетарианские салаты",
+    "веганские блюда", "безглютеновые блюда"
+]
+
+def fetch_categories(api_key, categories, concurrency=MAX_CONCURRENCY, rate=REQUESTS_PER_SECOND, cache=None,
+                     batch_size=BATCH_SIZE, metrics=None, exclude=None, limiter=None):
+    """Параллельный запрос категорий пулом потоков.
+
+    Категории объединяются в пакеты по batch_size (один запрос на пакет). Возвращает
+    генератор пар (категория, продукты) строго в исходном порядке категорий, поэтому
+    дальнейшая дедупликация детерминирована; продукты — итератор, который для одиночных
+    запросов при STREAM отдает продукты по мере разбора ответа, а иначе — после его получения.
+    В работе одновременно находится не более concurrency запросов; при закрытии
+    генератора ещё не начатые запросы отменяются. exclude — {категория: уже собранные
+    названия} для дозапросов; limiter можно передать, чтобы несколько вызовов делили лимит.
+    """
+    # Общий лимит растет с числом ключей; лимит каждого ключа соблюдает пул клиентов
+    pool = get_pool(api_key, rate)
+    limiter = limiter if limiter is not None else TokenBucket(rate * pool.size, capacity=concurrency)
+    done = object()
+
+    def fetch(batch, stream):
+        try:
+            if stream is not None:
+                category = batch[0]
+                return {category: get_real_food_data(pool, category, 15, cache, limiter, metrics,
+                                                     exclude=(exclude or {}).get(category), on_item=stream.put)}
+            return get_batch_food_data(pool, batch, count=15, cache=cache, limiter=limiter, metrics=metrics,
+                                       exclude=exclude)
+        finally:
+            if stream is not None:
+                stream.put(done)
+
+    def submit(batch):
+        stream = SimpleQueue() if STREAM and len(batch) == 1 else None
+        return batch, executor.submit(fetch, batch, stream), stream
+
+    def received(category, future, stream):
+        count = 0
+        if stream is not None:
+            for item in iter(stream.get, done):
+                count += 1
+                yield item
+        # Продукты, не прошедшие через поток (пакетный запрос или ответ без JSON-массива)
+        if not count:
+            yield from future.result().get(category, [])
+
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    pending = deque()
+    queue = (categories[i:i + batch_size] for i in range(0, len(categories), batch_size))
+    try:
+        for batch in queue:
+            pending.append(submit(batch))
+            if len(pending) >= concurrency:
+                break
+        while pending:
+            batch, future, stream = pending.popleft()
+            # Продукты текущего пакета обрабатываются, пока остальные запросы выполняются в фоне
+            for category in batch:
+                yield category, received(category, future, stream)
+            future.exception()
+            next_batch = next(queue, None)
+            if next_batch is not None:
+                pending.append(submit(next_batch))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def shard_categories(categories, index, count):
+    """Категории шарда index из count (по кругу, поэтому шарды получают поровну категорий)"""
+    return categories[index::count]
+
+def shard_path(path, index, count):
+    """Путь к файлу шарда: food_database.jsonl -> food_database.shard-1-of-4.jsonl"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.shard-{index + 1}-of-{count}{ext}"
+
+def parse_shard(value):
+    """Разбор номера шарда "I/N" (I от 1 до N) в пару (индекс с нуля, N)"""
+    index, _, count = value.partition("/")
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"ожидается I/N, получено: {value}")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"номер шарда должен быть от 1 до {count}")
+    return index - 1, count
+
+def generate_full_database(api_key, target_count=1500, concurrency=MAX_CONCURRENCY, rate=REQUESTS_PER_SECOND,
+                           cache=None, journal=None, batch_size=BATCH_SIZE, metrics=None, adaptive=True,
+                           timestamp=TIMESTAMP, categories=None):
+    """Генерация полной базы данных продуктов.
+
+    Если передан journal, каждый принятый продукт сразу дописывается в журнал,
+    а уже завершенные в нем категории и названия учитываются при продолжении работы.
+    Если после прохода по всем категориям цель не достигнута и adaptive=True,
+    категории с наибольшим выходом новых продуктов дозапрашиваются со списком
+    "не повторяй" (см. YieldScheduler), пока не будет достигнута цель или не
+    иссякнут все категории. categories — список категорий (по умолчанию CATEGORIES,
+    для шарда — его часть).
+    Возвращает продукты, принятые в текущем запуске; метрики запуска копятся в metrics.
+    """
+    metrics = metrics if metrics is not None else Metrics()
+    start_time = time.time()
     food_data = []
-    unique_titles = set()
+    # Индекс почти-дубликатов: "Лук зелёный"/"Лук зеленый", "Салат Цезарь"/"Цезарь" считаются одним продуктом
+    unique_titles = NearDuplicateIndex()
+    for title in (journal.titles if journal is not None else ()):
+        unique_titles.add(title)
+    total = journal.count if journal is not None else 0
+    all_categories = categories if categories is not None else CATEGORIES
+    categories = [c for c in all_categories if journal is None or c not in journal.done_categories]
+    scheduler = YieldScheduler(all_categories)
+    for category, titles in (journal.category_titles.items() if journal is not None else ()):
+        if category not in scheduler.titles:
+            continue
+        # Завершенные категории оцениваются по тому, сколько из них уже собрано
+        if category in journal.done_categories:
+            scheduler.record(category, titles)
+        else:
+            scheduler.titles[category].extend(titles)
+    pool = get_pool(api_key, rate)
+    limiter = TokenBucket(rate * pool.size, capacity=concurrency)
     
     print(f"Используем модель {MODEL_NAME} для сбора данных...")
     print("Источники: USDA, Роспотребнадзор, официальные таблицы калорийности")
-    print(f"Всего категорий для обработки: {len(categories)}")
+    print(f"Всего категорий для обработки: {len(categories)} из {len(all_categories)}")
     print(f"Целевое количество записей: {target_count}")
+    print(f"Параллельных запросов: {concurrency}, лимит: {rate} запр./сек на ключ, ключей: {pool.size}, "
+          f"категорий в запросе: {batch_size}")
+    if total:
+        print(f"Продолжение по журналу: уже собрано {total} записей")
     
-    for category in categories:
-        try:
-            print(f"\n{'='*50}\nОбработка категории: {category}")
-            # Запрашиваем по 15 примеров для каждой категории
-            products = get_real_food_data(api_key, category, count=15)
-            new_count = 0
+    if total >= target_count:
+        return food_data
+    
+    def accept(category, products):
+        """Проверка и прием продуктов категории по мере поступления.
+
+        Возвращает (принятые названия, получено продуктов, категория пройдена целиком).
+        """
+        nonlocal total
+        accepted = []
+        received = 0
+        for product in products:
+            received += 1
+            # Модель может вернуть строки вместо объектов или нестроковое название
+            if not isinstance(product, dict) or not isinstance(product.get("Title"), str):
+                metrics.inc("creator_products_total", result="invalid")
+                continue
+            title = product["Title"]
             
-            for product in products:
-                title = product["Title"]
+            # Проверка уникальности и валидности данных
+            if not title or not all(key in product for key in ["Calories", "Protein", "Fat", "Carbohydrates"]):
+                metrics.inc("creator_products_total", result="invalid")
+                continue
+            # Числа разбираются до проверки уникальности: некорректный продукт не занимает название
+            macros = [parse_number(product[key]) for key in ["Calories", "Protein", "Fat", "Carbohydrates"]]
+            if None in macros:
+                metrics.inc("creator_products_total", result="invalid")
+                continue
+            with metrics.timer("creator_dedup_seconds"):
+                duplicate = title in unique_titles
+            if duplicate:
+                metrics.inc("creator_products_total", result="duplicate")
+                continue
                 
-                # Проверка уникальности и валидности данных
-                if title in unique_titles:
-                    continue
-                if not all(key in product for key in ["Calories", "Protein", "Fat", "Carbohydrates"]):
-                    continue
-                    
-                unique_titles.add(title)
-                
-                # Добавление служебных полей
-                product["dateload"] = TIMESTAMP
-                product["shared"] = False
+            unique_titles.add(title)
+            metrics.inc("creator_products_total", result="accepted")
+            
+            # Добавление служебных полей
+            product["dateload"] = timestamp
+            product["shared"] = False
+            
+            # Преобразование типов с сохранением одного знака после запятой
+            product["Protein"] = round(macros[1], 1)
+            product["Fat"] = round(macros[2], 1)
+            product["Carbohydrates"] = round(macros[3], 1)
+            calories = macros[0]
+            product["Calories"] = str(int(calories)) if calories.is_integer() else str(round(calories, 1))
+            
+            if journal is not None:
+                journal.add_product(category, product)
+            if not food_data:
+                metrics.observe("creator_first_item_seconds", time.time() - start_time)
+            food_data.append(product)
+            accepted.append(title)
+            total += 1
+            
+            if total >= target_count:
+                return accepted, received, False
+        return accepted, received, True
+    
+    def process(requests, follow_up):
+        """Обработка результатов запросов по мере готовности в исходном порядке"""
+        for category, products in requests:
+            try:
+                accepted, received, completed = accept(category, products)
+                # Неудачный первый запрос не портит оценку: категория попадет в дозапросы
+                if received or follow_up:
+                    scheduler.record(category, accepted, follow_up)
                 
-                # Преобразование типов
-                product["Protein"] = int(product["Protein"])
-                product["Fat"] = int(product["Fat"])
-                product["Carbohydrates"] = int(product["Carbohydrates"])
-                product["Calories"] = str(product["Calories"])
+                stage = "дозапрос" if follow_up else "добавлено"
+                print(f"[{category}] {stage}: {len(accepted)} | всего: {total}/{target_count}")
+                metrics.event("category", category=category, received=received, accepted=len(accepted),
+                              total=total, follow_up=follow_up)
                 
-                food_data.append(product)
-                new_count += 1
+                # Пустой ответ означает неудачный запрос: категория будет повторена при продолжении
+                if journal is not None and not follow_up and received and completed:
+                    journal.mark_done(category)
                 
-                if len(food_data) >= target_count:
-                    break
-            
-            print(f"Добавлено: {new_count} | Всего: {len(food_data)}/{target_count}")
-            
-            if len(food_data) >= target_count:
-                break
+                if total >= target_count:
+                    return
                 
-            time.sleep(3)  # Соблюдение лимитов API
-            
-        except Exception as e:
-            print(f"Ошибка: {str(e)}. Повтор через 5 сек...")
-            time.sleep(5)
+            except Exception as e:
+                print(f"Ошибка при обработке категории {category}: {str(e)}")
+                # Сбойный дозапрос считается нулевым выходом, иначе категория выбиралась бы снова
+                if follow_up:
+                    scheduler.record(category, [], follow_up)
+    
+    process(fetch_categories(pool, categories, concurrency, rate, cache, batch_size, metrics,
+                             limiter=limiter), follow_up=False)
+    
+    # Дозапросы: категории, которые еще дают новые продукты, в порядке ожидаемого выхода
+    while adaptive and total < target_count:
+        round_categories = scheduler.next_round(concurrency)
+        if not round_categories:
+            print(f"Категории исчерпаны: новых уникальных продуктов почти нет, собрано {total}/{target_count}")
+            break
+        metrics.inc("creator_follow_up_rounds_total")
+        exclude = {category: scheduler.titles[category] for category in round_categories}
+        process(fetch_categories(pool, round_categories, concurrency, rate, cache, 1, metrics,
+                                 exclude=exclude, limiter=limiter), follow_up=True)
     
-    return food_data[:target_count]
+    report_costs(metrics, len(food_data), time.time() - start_time)
+    print("\n".join(pool.summary()))
+    return food_data
 
 def save_to_json(data, filename):
     """Сохранение данных в JSON-файл"""
@@ -251,18 +708,108 @@ def save_to_json(data, filename):
         json.dump(data, f, ensure_ascii=False, indent=2)
     print(f"\nФайл сохранен: {filename}")
 
-def main():
+def parse_args(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Генерация базы данных продуктов")
+    parser.add_argument('--target', type=int, default=TARGET_COUNT, help="целевое количество записей")
+    parser.add_argument('-o', '--output', default=OUTPUT_FILE, help="итоговый JSON-файл")
+    parser.add_argument('--compact-file', default=COMPACT_FILE, help="компактный бинарный файл для приложения")
+    parser.add_argument('--dateload', default=DATELOAD, help="дата загрузки для поля dateload (ГГГГ-ММ-ДД)")
+    parser.add_argument('--concurrency', type=int, default=MAX_CONCURRENCY, help="параллельных запросов")
+    parser.add_argument('--rate', type=float, default=REQUESTS_PER_SECOND, help="лимит запросов в секунду на ключ")
+    parser.add_argument('--refresh', action='store_true',
+                        help="игнорировать кэш ответов и запросить все категории заново")
+    parser.add_argument('--no-cache', action='store_true', help="не использовать кэш ответов")
+    parser.add_argument('--cache-file', default=DEFAULT_CACHE_FILE, help="путь к файлу кэша ответов")
+    parser.add_argument('--resume', action='store_true',
+                        help="продолжить прерванный запуск по журналу, пропуская завершенные категории")
+    parser.add_argument('--journal', default=DEFAULT_JOURNAL_FILE, help="путь к журналу генерации (JSONL)")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help="количество категорий в одном запросе к модели")
+    parser.add_argument('--no-adaptive', action='store_true',
+                        help="не дозапрашивать категории, если после первого прохода цель не достигнута")
+    parser.add_argument('--shard', type=parse_shard, metavar='I/N',
+                        help="обработать только шард I из N (категории по кругу); результат — журнал шарда, "
+                             "итоговый JSON собирается командой merge")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="запустить N шардов отдельными процессами и слить их результаты")
+    parser.add_argument('--metrics-file', help="файл событий метрик (JSON lines)")
+    parser.add_argument('--prometheus-file', help="файл итоговых метрик в текстовом формате Prometheus")
+    return parser.parse_args(argv)
+
+def run_workers(args, argv):
+    """Генерация шардами в args.workers процессах с последующим слиянием; возвращает число записей"""
+    workers = args.workers
+    argv = list(sys.argv[1:] if argv is None else argv)
+    processes = []
+    for index in range(workers):
+        # Лимиты делятся между процессами: все они используют одни и те же ключи
+        processes.append(subprocess.Popen([
+            sys.executable, os.path.abspath(__file__), *argv, "--workers", "1", "--shard", f"{index + 1}/{workers}",
+            "--rate", str(args.rate / workers), "--concurrency", str(max(1, math.ceil(args.concurrency / workers))),
+        ]))
+    failed = [index + 1 for index, process in enumerate(processes) if process.wait() != 0]
+    if failed:
+        print(f"Шарды завершились с ошибкой: {failed}. Сливаются уже собранные данные, "
+              f"незавершенные шарды можно продолжить с --resume --shard I/{workers}")
+    
+    paths = [shard_path(args.journal, index, workers) for index in range(workers)]
+    conflicts = []
+    total = merge_shards([path for path in paths if os.path.exists(path)], args.output,
+                         on_conflict=lambda record, size: conflicts.append(record["Title"]))
+    print(f"\nШарды слиты: {total} записей, объединено дубликатов между шардами: {len(conflicts)}")
+    return total
+
+def main(argv=None, prog=None):
+    args = parse_args(argv, prog)
+    
     if not OPENAI_API_KEY or OPENAI_API_KEY == "ВАШ_API_КЛЮЧ":
         print("Ошибка: Необходимо установить корректный API ключ OpenAI")
         print("Пожалуйста, создайте файл .env с переменной REACT_APP_OPENAI_API_KEY=ваш_ключ")
         return
     
-    # Генерация базы данных
-    food_database = generate_full_database(OPENAI_API_KEY, 3000)
-    
-    # Сохранение результатов
-    save_to_json(food_database, OUTPUT_FILE)
-    print(f"Успешно собрано {len(food_database)} записей")
+    if args.workers > 1 and args.shard is None:
+        total = run_workers(args, argv)
+    else:
+        categories, target, journal_path = CATEGORIES, args.target, args.journal
+        metrics_file, prometheus_file = args.metrics_file, args.prometheus_file
+        if args.shard is not None:
+            # Шард работает независимо (в том числе на другой машине) и пишет только свои файлы
+            index, count = args.shard
+            categories = shard_categories(CATEGORIES, index, count)
+            target = math.ceil(args.target / count)
+            journal_path = shard_path(args.journal, index, count)
+            metrics_file = metrics_file and shard_path(metrics_file, index, count)
+            prometheus_file = prometheus_file and shard_path(prometheus_file, index, count)
+        
+        # Генерация базы данных
+        cache = None if args.no_cache else ResponseCache(args.cache_file, refresh=args.refresh)
+        journal = Journal(journal_path, resume=args.resume)
+        metrics = Metrics(metrics_file)
+        try:
+            generate_full_database(OPENAI_API_KEY, target, args.concurrency, args.rate, cache=cache,
+                                   journal=journal, batch_size=args.batch_size, metrics=metrics,
+                                   adaptive=not args.no_adaptive,
+                                   timestamp=int(datetime.fromisoformat(args.dateload).timestamp()),
+                                   categories=categories)
+        finally:
+            journal.close()
+            print("\n".join(metrics.summary()))
+            if prometheus_file:
+                metrics.write_prometheus(prometheus_file)
+            metrics.close()
+        
+        if args.shard is not None:
+            print(f"\nЖурнал шарда {args.shard[0] + 1}/{args.shard[1]}: {journal_path}. "
+                  f"Итоговый файл: python cli.py merge <журналы шардов> -o {args.output}")
+            return
+        
+        # Сохранение результатов: итоговый JSON собирается потоково из журнала
+        total = write_json_from_journal(journal_path, args.output)
+    print(f"\nФайл сохранен: {args.output}")
+    with open(args.output, 'r', encoding='utf-8') as f:
+        export_compact(iter_json_array(f), args.compact_file)
+    print(f"Файл сохранен: {args.compact_file}")
+    print(f"Успешно собрано {total} записей")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,173 @@
+"""Поиск почти одинаковых названий продуктов: нормализация и индекс MinHash/LSH по триграммам"""
+import argparse
+import hashlib
+import re
+import struct
+from functools import lru_cache
+from json_stream import iter_json_array, write_json_array
+
+STOP_WORDS = {"с", "со", "и", "в", "во", "на", "из", "по", "без", "для"}
+# Слова-типы блюд: "Салат Цезарь" и "Цезарь" — одно и то же, но "Салат с авокадо" — не "Авокадо"
+KIND_WORDS = {"салат", "суп", "соус", "блюдо", "напиток"}
+
+DEFAULT_THRESHOLD = 0.82
+NUM_PERM = 32  # Длина сигнатуры MinHash (не более 32: дайджест BLAKE2b ограничен 64 байтами)
+
+
+def _words(title):
+    return re.findall(r'\w+', title.casefold().replace('ё', 'е'))
+
+
+def normalize_title(title):
+    """Нормализация: регистр, ё→е, без пунктуации и служебных слов, слова по алфавиту.
+
+    Тип блюда отбрасывается, если за ним не следует предлог ("Суп гороховый" → "гороховый").
+    """
+    words = _words(title)
+    significant = [
+        w for i, w in enumerate(words)
+        if w not in STOP_WORDS and not (w in KIND_WORDS and (i + 1 >= len(words) or words[i + 1] not in STOP_WORDS))
+    ]
+    return " ".join(sorted(significant or words))
+
+
+def title_features(title):
+    """Признаки, которые обязаны совпадать у дубликатов: числа и тип блюда"""
+    words = _words(title)
+    return frozenset(w for w in words if w.isdigit()), frozenset(w for w in words if w in KIND_WORDS)
+
+
+def compatible(a, b):
+    """Числа ("1%" и "3,2%") должны совпадать, типы блюд — если указаны у обоих"""
+    (numbers_a, kinds_a), (numbers_b, kinds_b) = a, b
+    return numbers_a == numbers_b and (not kinds_a or not kinds_b or kinds_a == kinds_b)
+
+
+def trigrams(key):
+    """Множество символьных триграмм нормализованного названия"""
+    padded = f" {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)} or {padded}
+
+
+@lru_cache(maxsize=1 << 17)
+def _gram_hashes(gram):
+    """NUM_PERM независимых 16-битных хэшей триграммы из одного дайджеста BLAKE2b"""
+    return struct.unpack(f"<{NUM_PERM}H", hashlib.blake2b(gram.encode('utf-8'), digest_size=2 * NUM_PERM).digest())
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class NearDuplicateIndex:
+    """Индекс названий для поиска почти-дубликатов за время, не зависящее от размера каталога.
+
+    Точные совпадения нормализованных названий находятся по словарю, остальные — через
+    MinHash LSH: кандидаты из совпавших корзин проверяются точным коэффициентом Жаккара
+    по триграммам. Поддерживает `title in index` и `index.add(title)`, как обычное множество.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, bands=8):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = NUM_PERM // bands
+        self.exact = {}
+        self.buckets = [{} for _ in range(bands)]
+        self.shingles = []
+        self.features = []
+        self.titles = []
+
+    def _signature(self, grams):
+        # MinHash: для каждой из NUM_PERM хэш-функций — минимум по всем триграммам
+        return [min(column) for column in zip(*map(_gram_hashes, grams))]
+
+    def _band_keys(self, signature, numbers):
+        # Числа в названии обязаны совпадать (см. compatible), поэтому входят в ключ корзины:
+        # "Молоко 1%" и "Молоко 2,5%" не становятся кандидатами друг для друга
+        rows = self.rows
+        return [(numbers, tuple(signature[i * rows:(i + 1) * rows])) for i in range(self.bands)]
+
+    def find(self, title):
+        """Возвращает уже известное название, почти совпадающее с title, или None"""
+        idx = self.find_id(title)
+        return self.titles[idx] if idx is not None else None
+
+    def find_id(self, title):
+        """Номер (в порядке добавления) известного названия, почти совпадающего с title, или None"""
+        key = normalize_title(title)
+        features = title_features(title)
+        if key in self.exact and compatible(features, self.features[self.exact[key]]):
+            return self.exact[key]
+        grams = trigrams(key)
+        candidates = set()
+        for bucket, band_key in zip(self.buckets, self._band_keys(self._signature(grams), features[0])):
+            candidates.update(bucket.get(band_key, ()))
+        best, best_score = None, self.threshold
+        size = len(grams)
+        for idx in candidates:
+            other = self.shingles[idx]
+            # Жаккар не превышает отношения размеров множеств — дешевый отсев до точного подсчета
+            if min(size, len(other)) < self.threshold * max(size, len(other)):
+                continue
+            if not compatible(features, self.features[idx]):
+                continue
+            score = jaccard(grams, other)
+            if score >= best_score:
+                best, best_score = idx, score
+        return best
+
+    def add(self, title):
+        """Добавление названия в индекс"""
+        key = normalize_title(title)
+        grams = trigrams(key)
+        idx = len(self.titles)
+        features = title_features(title)
+        self.titles.append(title)
+        self.shingles.append(grams)
+        self.features.append(features)
+        self.exact.setdefault(key, idx)
+        for bucket, band_key in zip(self.buckets, self._band_keys(self._signature(grams), features[0])):
+            bucket.setdefault(band_key, []).append(idx)
+
+    def __contains__(self, title):
+        return self.find(title) is not None
+
+    def __len__(self):
+        return len(self.titles)
+
+
+def dedupe_records(records, threshold=DEFAULT_THRESHOLD, on_duplicate=None):
+    """Потоковое удаление почти-дубликатов: остается первая запись из каждой группы"""
+    index = NearDuplicateIndex(threshold)
+    for record in records:
+        match = index.find(record["Title"])
+        if match is not None:
+            if on_duplicate is not None:
+                on_duplicate(record["Title"], match)
+            continue
+        index.add(record["Title"])
+        yield record
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Удаление почти одинаковых продуктов из базы")
+    parser.add_argument('input', nargs='?', default="food_database.json", help="исходный JSON-файл")
+    parser.add_argument('-o', '--output', default="food_database.dedup.json", help="файл результата")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="порог сходства триграмм (коэффициент Жаккара)")
+    args = parser.parse_args(argv)
+
+    removed = []
+    with open(args.input, 'r', encoding='utf-8') as src, open(args.output, 'w', encoding='utf-8') as out:
+        kept = write_json_array(
+            dedupe_records(iter_json_array(src), args.threshold,
+                           on_duplicate=lambda title, match: removed.append((title, match))),
+            out
+        )
+    for title, match in removed:
+        print(f"Дубликат: {title!r} ~ {match!r}")
+    print(f"Оставлено {kept} записей, удалено {len(removed)}. Результат: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""Компактный бинарный формат базы для калькулятора калорий с готовым поисковым индексом.
+
+Файл читается через mmap без разбора: все данные лежат в секциях фиксированного формата
+(little-endian, каждая секция выровнена по 8 байт).
+
+Заголовок: сигнатура b"FOODDB\\0\\1", uint32 количество записей n, uint32 количество секций k,
+затем k записей каталога секций: имя (8 байт ASCII, дополнено нулями), uint64 смещение, uint64 длина.
+
+Секции:
+    TITLEOFF  uint32[n + 1]  смещения названий в TITLES
+    TITLES    UTF-8          названия подряд (строковая таблица)
+    CAL, PROT, FAT, CARB     float32[n]  калорийность и БЖУ на 100 г
+    DATELOAD  uint32[n]      метка времени загрузки
+    SHARED    uint8[n]       признак shared
+    PREFIX    id[n]          номера записей, отсортированные по ключу поиска (префиксный поиск — бинарный)
+    TRIKEYOF  uint32[t + 1]  смещения триграмм в TRIKEYS
+    TRIKEYS   UTF-8          отсортированные триграммы ключей поиска
+    POSTOFF   uint32[t + 1]  смещения списков записей в POSTINGS
+    POSTINGS  id[...]        номера записей для каждой триграммы (по возрастанию)
+
+Номера записей (id) хранятся как uint16 при n ≤ 65535, иначе как uint32.
+Ключ поиска — название в нижнем регистре с заменой ё на е.
+"""
+import argparse
+import mmap
+import struct
+import time
+from array import array
+from bisect import bisect_left
+from itertools import islice
+from json_stream import iter_json_array, parse_number
+
+MAGIC = b"FOODDB\x00\x01"
+HEADER = struct.Struct("<8sII")
+SECTION = struct.Struct("<8sQQ")
+NUMERIC_FIELDS = (("CAL", "Calories"), ("PROT", "Protein"), ("FAT", "Fat"), ("CARB", "Carbohydrates"))
+
+
+def search_key(title):
+    return title.casefold().replace('ё', 'е')
+
+
+def key_trigrams(key):
+    return {key[i:i + 3] for i in range(len(key) - 2)}
+
+
+def id_format(count):
+    """Код типа для номеров записей: uint16 для небольших баз, иначе uint32"""
+    return 'H' if count <= 0xFFFF else 'I'
+
+
+def _string_table(strings):
+    """Строковая таблица: (uint32 смещения, байты UTF-8)"""
+    offsets = array('I', [0])
+    data = bytearray()
+    for s in strings:
+        data += s.encode('utf-8')
+        offsets.append(len(data))
+    return offsets, bytes(data)
+
+
+def export_compact(records, path):
+    """Запись базы в компактный формат; возвращает количество записей"""
+    titles = []
+    numeric = {name: array('f') for name, _ in NUMERIC_FIELDS}
+    dateload = array('I')
+    shared = bytearray()
+    for record in records:
+        titles.append(record["Title"])
+        for name, field in NUMERIC_FIELDS:
+            numeric[name].append(parse_number(record.get(field), float('nan')))
+        dateload.append(int(record.get("dateload", 0)))
+        shared.append(1 if record.get("shared") else 0)
+
+    keys = [search_key(title) for title in titles]
+    ids = id_format(len(titles))
+    prefix = array(ids, sorted(range(len(keys)), key=keys.__getitem__))
+
+    postings = {}
+    for i, key in enumerate(keys):
+        for gram in key_trigrams(key):
+            postings.setdefault(gram, array(ids)).append(i)
+    grams = sorted(postings, key=lambda g: g.encode('utf-8'))
+    post_offsets = array('I', [0])
+    post_data = array(ids)
+    for gram in grams:
+        post_data.extend(postings[gram])
+        post_offsets.append(len(post_data))
+
+    title_offsets, title_data = _string_table(titles)
+    gram_offsets, gram_data = _string_table(grams)
+    sections = [("TITLEOFF", title_offsets.tobytes()), ("TITLES", title_data)]
+    sections += [(name, numeric[name].tobytes()) for name, _ in NUMERIC_FIELDS]
+    sections += [
+        ("DATELOAD", dateload.tobytes()), ("SHARED", bytes(shared)), ("PREFIX", prefix.tobytes()),
+        ("TRIKEYOF", gram_offsets.tobytes()), ("TRIKEYS", gram_data),
+        ("POSTOFF", post_offsets.tobytes()), ("POSTINGS", post_data.tobytes()),
+    ]
+
+    offset = _align(HEADER.size + SECTION.size * len(sections))
+    directory = []
+    for name, data in sections:
+        directory.append(SECTION.pack(name.encode('ascii'), offset, len(data)))
+        offset = _align(offset + len(data))
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(titles), len(sections)))
+        f.write(b"".join(directory))
+        for name, data in sections:
+            f.write(b"\0" * (_align(f.tell()) - f.tell()))
+            f.write(data)
+    return len(titles)
+
+
+def _align(offset, alignment=8):
+    return (offset + alignment - 1) // alignment * alignment
+
+
+class CompactDatabase:
+    """Чтение компактного файла через mmap: записи и индексы доступны без разбора всего файла"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self.mmap)
+        magic, self.count, section_count = HEADER.unpack_from(view, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: неизвестный формат файла")
+        sections = {}
+        for i in range(section_count):
+            name, offset, length = SECTION.unpack_from(view, HEADER.size + i * SECTION.size)
+            sections[name.rstrip(b"\0").decode('ascii')] = view[offset:offset + length]
+        self.title_offsets = sections["TITLEOFF"].cast('I')
+        self.titles = sections["TITLES"]
+        self.numeric = {field: sections[name].cast('f') for name, field in NUMERIC_FIELDS}
+        self.dateload = sections["DATELOAD"].cast('I')
+        self.shared = sections["SHARED"]
+        self.prefix = sections["PREFIX"].cast(id_format(self.count))
+        self.gram_offsets = sections["TRIKEYOF"].cast('I')
+        self.grams = sections["TRIKEYS"]
+        self.post_offsets = sections["POSTOFF"].cast('I')
+        self.postings = sections["POSTINGS"].cast(id_format(self.count))
+
+    def __len__(self):
+        return self.count
+
+    def title(self, i):
+        return bytes(self.titles[self.title_offsets[i]:self.title_offsets[i + 1]]).decode('utf-8')
+
+    def record(self, i):
+        """Запись в формате food_database.json"""
+        record = {"Title": self.title(i)}
+        for field, values in self.numeric.items():
+            value = round(values[i], 1)
+            record[field] = value
+        record["dateload"] = self.dateload[i]
+        record["shared"] = bool(self.shared[i])
+        return record
+
+    def search_prefix(self, prefix, limit=20):
+        """Номера записей, название которых начинается с prefix (бинарный поиск по PREFIX)"""
+        prefix = search_key(prefix)
+        start = bisect_left(self.prefix, prefix, key=lambda i: search_key(self.title(i)))
+        result = []
+        for pos in range(start, min(start + limit, self.count)):
+            i = self.prefix[pos]
+            if not search_key(self.title(i)).startswith(prefix):
+                break
+            result.append(i)
+        return result
+
+    def _gram(self, j):
+        return bytes(self.grams[self.gram_offsets[j]:self.gram_offsets[j + 1]])
+
+    def _posting(self, gram):
+        """Отсортированный список записей для триграммы (срез POSTINGS без копирования)"""
+        encoded = gram.encode('utf-8')
+        t = len(self.gram_offsets) - 1
+        j = bisect_left(range(t), encoded, key=self._gram)
+        if j == t or self._gram(j) != encoded:
+            return self.postings[0:0]
+        return self.postings[self.post_offsets[j]:self.post_offsets[j + 1]]
+
+    def search(self, text, limit=20):
+        """Номера записей, название которых содержит text (пересечение списков триграмм).
+
+        Для запросов короче трех символов триграмм нет: названия просматриваются подряд.
+        """
+        key = search_key(text)
+        grams = key_trigrams(key)
+        if not grams:
+            matches = (i for i in range(self.count) if key in search_key(self.title(i)))
+            return list(islice(matches, limit))
+        # Начинаем с самого короткого списка, остальные проверяем бинарным поиском
+        postings = sorted((self._posting(gram) for gram in grams), key=len)
+        candidates = []
+        for i in postings[0]:
+            for posting in postings[1:]:
+                pos = bisect_left(posting, i)
+                if pos == len(posting) or posting[pos] != i:
+                    break
+            else:
+                if key in search_key(self.title(i)):
+                    candidates.append(i)
+                    if len(candidates) >= limit:
+                        break
+        return candidates
+
+    def close(self):
+        for attr in ("title_offsets", "titles", "dateload", "shared", "prefix",
+                     "gram_offsets", "grams", "post_offsets", "postings"):
+            getattr(self, attr).release()
+        for values in self.numeric.values():
+            values.release()
+        self.mmap.close()
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Экспорт базы продуктов в компактный бинарный формат")
+    parser.add_argument('input', nargs='?', default="food_database.json", help="исходный JSON-файл")
+    parser.add_argument('-o', '--output', default="food_database.bin", help="файл результата")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    with open(args.input, 'r', encoding='utf-8') as f:
+        count = export_compact(iter_json_array(f), args.output)
+    print(f"Экспортировано {count} записей в {args.output} за {time.perf_counter() - start:.2f} с")
+
+
+if __name__ == "__main__":
+    main()
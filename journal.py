@@ -0,0 +1,113 @@
+"""Журнал генерации в формате JSONL: принятые продукты и отметки о завершенных категориях"""
+import json
+import os
+from itertools import islice
+from json_stream import iter_json_array, write_json_array
+
+DEFAULT_JOURNAL_FILE = "food_database.jsonl"
+
+
+class Journal:
+    """Инкрементальный журнал генерации.
+
+    Каждая строка — либо принятый продукт {"category": ..., "product": {...}},
+    либо отметка {"category": ..., "done": true}. При resume=True состояние
+    (уникальные названия, названия по категориям, завершенные категории)
+    восстанавливается из файла, иначе журнал начинается заново.
+    """
+
+    def __init__(self, path=DEFAULT_JOURNAL_FILE, resume=False):
+        self.path = path
+        self.titles = set()
+        self.category_titles = {}
+        self.done_categories = set()
+        self.count = 0
+        if resume and os.path.exists(path):
+            # Новые записи не должны дописываться к оборванной строке: она пропускается при чтении
+            truncate_torn_tail(path)
+            for entry in read_entries(path):
+                if entry.get("done"):
+                    self.done_categories.add(entry["category"])
+                elif "product" in entry:
+                    self._remember(entry["category"], entry["product"]["Title"])
+        self.file = open(path, 'a' if resume else 'w', encoding='utf-8')
+
+    def add_product(self, category, product):
+        """Запись принятого продукта сразу на диск"""
+        self._write({"category": category, "product": product})
+        self._remember(category, product["Title"])
+
+    def _remember(self, category, title):
+        self.titles.add(title)
+        self.category_titles.setdefault(category, []).append(title)
+        self.count += 1
+
+    def mark_done(self, category):
+        """Отметка о полностью обработанной категории"""
+        self._write({"category": category, "done": True})
+        os.fsync(self.file.fileno())
+        self.done_categories.add(category)
+
+    def _write(self, entry):
+        self.file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def truncate_torn_tail(path, chunk_size=1 << 16):
+    """Обрезка файла до последнего завершенного перевода строки (оборванная запись после сбоя)"""
+    with open(path, 'rb+') as f:
+        end = pos = f.seek(0, os.SEEK_END)
+        while pos > 0:
+            start = max(0, pos - chunk_size)
+            f.seek(start)
+            newline = f.read(pos - start).rfind(b"\n")
+            if newline >= 0:
+                pos = start + newline + 1
+                break
+            pos = start
+        if pos < end:
+            f.truncate(pos)
+
+
+def read_entries(path):
+    """Построчное чтение журнала; оборванная последняя строка (после сбоя) пропускается"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def iter_products(path):
+    """Потоковое чтение продуктов из журнала"""
+    for entry in read_entries(path):
+        if "product" in entry:
+            yield entry["product"]
+
+
+def iter_records(path):
+    """Ленивое чтение записей: JSON-массив или журнал генерации .jsonl (только продукты)"""
+    if path.endswith('.jsonl'):
+        yield from iter_products(path)
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        yield from iter_json_array(f)
+
+
+def write_json_from_journal(journal_path, output_path, limit=None):
+    """Потоковая сборка итогового JSON-массива из журнала без загрузки всех записей в память.
+
+    Формат совпадает с json.dump(..., indent=2). Возвращает количество записанных продуктов.
+    """
+    products = iter_products(journal_path)
+    if limit is not None:
+        products = islice(products, limit)
+    with open(output_path, 'w', encoding='utf-8') as out:
+        return write_json_array(products, out)
@@ -0,0 +1,131 @@
+"""Инкрементальный разбор JSON-массива: элементы отдаются по мере поступления данных"""
+import json
+import math
+import re
+
+_WHITESPACE = " \t\r\n"
+_SKIP_WHITESPACE = re.compile(r'[ \t\r\n]*').match
+_SKIP_SEPARATORS = re.compile(r'[ \t\r\n,]*').match
+
+
+class ArrayItemParser:
+    """Потоковый парсер JSON-массива верхнего уровня.
+
+    Данные подаются частями через feed(), который возвращает список полностью
+    полученных элементов массива. В памяти хранится только текущий незавершенный
+    элемент, поэтому объем потребляемой памяти не зависит от размера массива.
+    """
+
+    def __init__(self):
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.started = False
+        self.finished = False
+
+    def feed(self, chunk):
+        """Добавление очередной части данных; возвращает список готовых элементов"""
+        if self.finished:
+            return []
+        self.buffer += chunk
+        items = []
+        while True:
+            self.pos = _SKIP_WHITESPACE(self.buffer, self.pos).end()
+            if self.pos >= len(self.buffer):
+                break
+            if not self.started:
+                if self.buffer[self.pos] != "[":
+                    raise ValueError(f"Ожидался JSON-массив, получено: {self.buffer[self.pos]!r}")
+                self.started = True
+                self.pos += 1
+                continue
+            self.pos = _SKIP_SEPARATORS(self.buffer, self.pos).end()
+            if self.pos >= len(self.buffer):
+                break
+            if self.buffer[self.pos] == "]":
+                self.finished = True
+                self.pos += 1
+                break
+            try:
+                item, end = self.decoder.scan_once(self.buffer, self.pos)
+            except (StopIteration, json.JSONDecodeError):
+                # Элемент еще не получен целиком
+                break
+            if not isinstance(item, (dict, list)) and (
+                    end >= len(self.buffer) or self.buffer[end] not in _WHITESPACE + ",]"):
+                # Скалярное значение считается полным только после разделителя (например, число "2." → "2.5")
+                break
+            items.append(item)
+            self.pos = end
+        self._compact()
+        return items
+
+    def close(self):
+        """Проверка, что массив завершен и после него нет лишних данных"""
+        self.pos = _SKIP_WHITESPACE(self.buffer, self.pos).end()
+        if not self.finished or self.pos < len(self.buffer):
+            raise ValueError("Неполный или некорректный JSON-массив")
+
+    def _compact(self):
+        if self.pos:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+
+
+class ResponseItemParser:
+    """Извлечение элементов первого JSON-массива из текста ответа модели по мере его поступления.
+
+    Текст до первого "[" (пояснения, ```json, начало {"items": ...}) и все после конца
+    массива пропускаются. Если ответ оборван, уже полученные элементы сохраняются:
+    потерян только незавершенный хвост.
+    """
+
+    def __init__(self):
+        self.parser = ArrayItemParser()
+        self.started = False
+
+    def feed(self, chunk):
+        """Добавление очередной части ответа; возвращает список готовых элементов"""
+        if not self.started:
+            start = chunk.find("[")
+            if start < 0:
+                return []
+            self.started = True
+            chunk = chunk[start:]
+        return self.parser.feed(chunk)
+
+    @property
+    def finished(self):
+        return self.parser.finished
+
+
+def parse_number(value, default=None):
+    """Число из значения модели: "12,5" → 12.5; нечисловое или бесконечное → default"""
+    try:
+        number = float(str(value).replace(',', '.'))
+    except (TypeError, ValueError):
+        return default
+    return number if math.isfinite(number) else default
+
+
+def iter_json_array(f, chunk_size=1 << 16):
+    """Ленивое чтение элементов JSON-массива из открытого текстового файла"""
+    parser = ArrayItemParser()
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        yield from parser.feed(chunk)
+    parser.close()
+
+
+def write_json_array(records, f):
+    """Потоковая запись записей JSON-массивом в формате json.dump(..., indent=2); возвращает их количество"""
+    count = 0
+    f.write("[")
+    for record in records:
+        text = json.dumps(record, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+        f.write(("," if count else "") + "\n  " + text)
+        count += 1
+    f.write("\n]" if count else "]")
+    return count
@@ -1,22 +1,36 @@
+import argparse
 import os
 import json
 import logging
+import random
+import threading
+import time
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
 from datetime import datetime
 from dotenv import load_dotenv
-import firebase_admin
-from firebase_admin import credentials, firestore, storage
-
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('firebase_loader.log'),
-        logging.StreamHandler()
-    ]
-)
+from journal import iter_records
+from metrics import Metrics
+from sinks import MAX_BATCH_SIZE, FirestoreSink
+from sync import DEFAULT_MANIFEST_FILE, apply_committed, load_manifest, plan_sync, save_manifest
+
 logger = logging.getLogger('FirebaseLoader')
 
+DEFAULT_INPUT_FILE = 'food_database.json'
+DEFAULT_COLLECTION = 'menu'
+MAX_IN_FLIGHT = 4  # Количество пакетов, коммитящихся одновременно
+
+def setup_logging():
+    """Настройка логирования в консоль и firebase_loader.log (только при запуске загрузчика)"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('firebase_loader.log'),
+            logging.StreamHandler()
+        ]
+    )
+
 def load_environment():
     """Загрузка переменных окружения"""
     try:
@@ -31,11 +45,7 @@ def initialize_firebase():
     """Инициализация Firebase с использованием сервисного аккаунта из .env файла"""
     try:
         import firebase_admin
-        from firebase_admin import credentials, firestore
-        import json
-        
-        # Путь к файлу .env
-        env_path = os.path.join(os.path.dirname(__file__), '.env')
+        from firebase_admin import credentials
         
         # Создаем словарь с учетными данными напрямую
         service_account = {
@@ -57,20 +67,6 @@ def initialize_firebase():
     except Exception as e:
         logger.error(f"Ошибка инициализации Firebase: {e}", exc_info=True)
         return False
-        
-        # Инициализируем Firebase с учетными данными
-        if not firebase_admin._apps:
-            cred = credentials.Certificate(service_account)
-            firebase_admin.initialize_app(cred, {
-                'projectId': service_account.get('project_id')
-            })
-        
-        logger.info("Firebase успешно инициализирован с использованием сервисного аккаунта")
-        return True
-        
-    except Exception as e:
-        logger.error(f"Ошибка инициализации Firebase: {e}", exc_info=True)
-        return False
 
 def load_food_data(file_path):
     """Загрузка данных из JSON-файла"""
@@ -83,59 +79,202 @@ def load_food_data(file_path):
         logger.error(f"Ошибка загрузки данных из файла {file_path}: {e}")
         return None
 
-def upload_to_firestore(collection_name, data):
-    """Загрузка данных в Firestore с пакетной обработкой"""
+def iter_food_data(file_path):
+    """Ленивое чтение записей из файла: JSON-массив или журнал генерации .jsonl (только продукты).
+
+    Записи отдаются по одной, поэтому пиковое потребление памяти не зависит от размера файла.
+    """
+    return iter_records(file_path)
+
+def iter_batches(records, batch_size):
+    """Разбиение потока записей на пакеты без промежуточных копий всего списка"""
+    records = iter(records)
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            return
+        yield batch
+
+class AdaptiveBackoff:
+    """Общая для всех потоков задержка перед коммитом.
+
+    Ошибки конкуренции удваивают задержку, успешные коммиты постепенно снижают ее до нуля,
+    так что при перегрузке все параллельные коммиты одновременно сбавляют темп.
+    """
+
+    def __init__(self, initial=0.5, maximum=30.0):
+        self.initial = initial
+        self.maximum = maximum
+        self.delay = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        """Пауза перед коммитом; возвращает фактическую длительность"""
+        delay = self.delay
+        if not delay:
+            return 0.0
+        delay *= random.uniform(0.5, 1.0)
+        time.sleep(delay)
+        return delay
+
+    def success(self):
+        with self.lock:
+            self.delay = self.delay / 2 if self.delay > self.initial / 8 else 0.0
+
+    def failure(self):
+        with self.lock:
+            self.delay = min(self.maximum, max(self.initial, self.delay * 2))
+            return self.delay
+
+def commit_with_retry(sink, writes, backoff, max_retries=5, metrics=None):
+    """Коммит пакета с повторами; возвращает количество записанных документов"""
+    metrics = metrics if metrics is not None else Metrics()
+    for attempt in range(max_retries):
+        slept = backoff.wait()
+        if slept:
+            metrics.inc("loader_backoff_seconds_total", slept)
+        start = time.perf_counter()
+        try:
+            sink.commit(writes)
+            elapsed = time.perf_counter() - start
+            backoff.success()
+            metrics.observe("loader_commit_seconds", elapsed)
+            metrics.inc("loader_commits_total", outcome="ok")
+            metrics.inc("loader_documents_total", len(writes))
+            metrics.event("commit", documents=len(writes), seconds=round(elapsed, 4), attempt=attempt + 1)
+            return len(writes)
+        except Exception as e:
+            metrics.observe("loader_commit_seconds", time.perf_counter() - start)
+            metrics.inc("loader_commits_total", outcome="error")
+            metrics.event("commit_error", documents=len(writes), attempt=attempt + 1, error=type(e).__name__)
+            if attempt == max_retries - 1 or not sink.is_retryable(e):
+                logger.error(f"Не удалось загрузить пакет после {attempt + 1} попыток: {e}")
+                return 0
+            metrics.inc("loader_commit_retries_total")
+            delay = backoff.failure()
+            logger.warning(f"Повторная попытка {attempt + 1}/{max_retries}, задержка ~{delay:.1f} сек: {e}")
+    return 0
+
+def commit_batches(sink, writes, batch_size=MAX_BATCH_SIZE, max_in_flight=MAX_IN_FLIGHT, total=None,
+                   on_committed=None, metrics=None):
+    """Конвейерная запись потока операций (doc_id, данные) пакетами с параллельными коммитами.
+
+    on_committed(batch) вызывается в основном потоке для каждого успешно записанного пакета.
+    batch_size ограничивается MAX_BATCH_SIZE: пакеты больше лимита Firestore отклоняет.
+    Возвращает (записано, всего операций).
+    """
+    batch_size = min(batch_size, MAX_BATCH_SIZE)
+    processed = 0
+    success = 0
+    backoff = AdaptiveBackoff()
+    pending = {}
+    
+    def collect(return_when):
+        nonlocal success
+        done, _ = wait(pending, return_when=return_when)
+        for future in done:
+            batch = pending.pop(future)
+            written = future.result()
+            success += written
+            if written and on_committed is not None:
+                on_committed(batch)
+        logger.info(f"Загружено {success}/{total if total is not None else '?'} документов")
+    
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        for batch in iter_batches(writes, batch_size):
+            processed += len(batch)
+            pending[executor.submit(commit_with_retry, sink, batch, backoff, metrics=metrics)] = batch
+            # Ограничиваем число пакетов в памяти: ждем освобождения слота
+            if len(pending) >= max_in_flight:
+                collect(FIRST_COMPLETED)
+        if pending:
+            collect(ALL_COMPLETED)
+    
+    return success, processed
+
+def upload_to_firestore(collection_name, data, sink=None, batch_size=MAX_BATCH_SIZE, max_in_flight=MAX_IN_FLIGHT,
+                        metrics=None):
+    """Загрузка данных в Firestore пакетами с несколькими параллельными коммитами.
+
+    sink — приемник записи (по умолчанию FirestoreSink для collection_name),
+    max_in_flight — сколько пакетов может коммититься одновременно.
+    """
     try:
-        from firebase_admin import firestore
-        import time
+        if sink is None:
+            sink = FirestoreSink(collection_name)
         
-        db = firestore.client()
-        collection_ref = db.collection(collection_name)
+        # data может быть списком или ленивым итератором (см. iter_food_data)
+        total = len(data) if hasattr(data, '__len__') else None
+        writes = ((None, item) for item in data)
+        success, processed = commit_batches(sink, writes, batch_size, max_in_flight, total, metrics=metrics)
         
-        total = len(data)
-        success = 0
-        batch_size = 100  # Уменьшаем размер пакета для надежности
+        logger.info(f"Загрузка завершена. Успешно загружено {success} из {processed} документов")
+        return success
         
-        for i in range(0, total, batch_size):
-            batch = db.batch()
-            batch_data = data[i:i + batch_size]
-            
-            for item in batch_data:
-                try:
-                    # Добавляем метаданные
-                    item['uploaded_at'] = firestore.SERVER_TIMESTAMP
-                    # Создаем новый документ
-                    doc_ref = collection_ref.document()
-                    batch.set(doc_ref, item)
-                except Exception as e:
-                    logger.error(f"Ошибка при подготовке документа: {e}")
-                    continue
-            
-            # Пытаемся зафиксировать пакет несколько раз при ошибках
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    batch.commit()
-                    success += len(batch_data)
-                    logger.info(f"Загружено {min(i + len(batch_data), total)}/{total} документов")
-                    break
-                except Exception as e:
-                    if attempt == max_retries - 1:
-                        logger.error(f"Не удалось загрузить пакет после {max_retries} попыток: {e}")
-                    else:
-                        wait_time = (attempt + 1) * 2  # Экспоненциальная задержка
-                        logger.warning(f"Повторная попытка {attempt + 1}/{max_retries} через {wait_time} сек...")
-                        time.sleep(wait_time)
+    except Exception as e:
+        logger.error(f"Критическая ошибка при загрузке в Firestore: {e}", exc_info=True)
+        return 0
+
+def sync_to_firestore(collection_name, data, manifest_path=DEFAULT_MANIFEST_FILE, sink=None, delete_removed=False,
+                      force=False, batch_size=MAX_BATCH_SIZE, max_in_flight=MAX_IN_FLIGHT, metrics=None):
+    """Идемпотентная синхронизация: записываются только новые и измененные записи.
+
+    ID документов выводятся из нормализованного названия, по манифесту последней
+    синхронизации определяется, что изменилось. Повторный запуск без изменений
+    не выполняет ни одной записи. Возвращает количество выполненных операций.
+    """
+    try:
+        if sink is None:
+            sink = FirestoreSink(collection_name)
+        
+        manifest = load_manifest(manifest_path)
+        writes = plan_sync(data, manifest, delete_removed=delete_removed, force=force)
+        try:
+            success, processed = commit_batches(sink, writes, batch_size, max_in_flight,
+                                                on_committed=lambda batch: apply_committed(manifest, batch),
+                                                metrics=metrics)
+        finally:
+            # Манифест отражает только успешно закоммиченные пакеты, даже при сбое
+            save_manifest(manifest, manifest_path)
         
-        logger.info(f"Загрузка завершена. Успешно загружено {success} из {total} документов")
+        logger.info(f"Синхронизация завершена. Выполнено {success} из {processed} операций, "
+                    f"документов в манифесте: {len(manifest)}")
         return success
         
     except Exception as e:
-        logger.error(f"Критическая ошибка при загрузке в Firestore: {e}", exc_info=True)
+        logger.error(f"Критическая ошибка при синхронизации с Firestore: {e}", exc_info=True)
         return 0
 
-def main():
+def parse_batch_size(value):
+    """Размер пакета из аргумента командной строки: от 1 до MAX_BATCH_SIZE"""
+    size = int(value)
+    if not 1 <= size <= MAX_BATCH_SIZE:
+        raise argparse.ArgumentTypeError(f"размер пакета должен быть от 1 до {MAX_BATCH_SIZE}")
+    return size
+
+def parse_args(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Загрузка базы продуктов в Firestore")
+    parser.add_argument('input', nargs='?', default=DEFAULT_INPUT_FILE, help="JSON-массив или JSONL с записями")
+    parser.add_argument('--collection', default=DEFAULT_COLLECTION, help="коллекция Firestore")
+    parser.add_argument('--batch-size', type=parse_batch_size, default=MAX_BATCH_SIZE,
+                        help=f"документов в одном коммите (не больше {MAX_BATCH_SIZE})")
+    parser.add_argument('--max-in-flight', type=int, default=MAX_IN_FLIGHT,
+                        help="сколько пакетов коммитится одновременно")
+    parser.add_argument('--sync', action='store_true',
+                        help="инкрементальная синхронизация: записывать только новые и измененные записи")
+    parser.add_argument('--delete-removed', action='store_true',
+                        help="при --sync удалять документы, которых больше нет в файле")
+    parser.add_argument('--force', action='store_true', help="при --sync перезаписать все записи")
+    parser.add_argument('--manifest', default=DEFAULT_MANIFEST_FILE, help="путь к манифесту синхронизации")
+    parser.add_argument('--metrics-file', help="файл событий метрик (JSON lines)")
+    parser.add_argument('--prometheus-file', help="файл итоговых метрик в текстовом формате Prometheus")
+    return parser.parse_args(argv)
+
+def main(argv=None, prog=None):
     """Основная функция загрузчика"""
+    args = parse_args(argv, prog)
+    setup_logging()
+    
     logger.info("=" * 50)
     logger.info("Запуск загрузчика данных в Firebase")
     logger.info(f"Время запуска: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -148,16 +287,31 @@ def main():
     if not initialize_firebase():
         return
     
-    # Загрузка данных из файла
-    data = load_food_data('food_database.json')
-    if not data:
-        logger.error("Не удалось загрузить данные из файла")
+    # Потоковое чтение данных из файла
+    file_path = args.input
+    if not os.path.exists(file_path):
+        logger.error(f"Не удалось загрузить данные из файла: {file_path} не найден")
         return
+    data = iter_food_data(file_path)
     
     # Загрузка в Firestore
     logger.info("Начало загрузки данных в Firestore...")
-    collection_name = 'menu'
-    uploaded_count = upload_to_firestore(collection_name, data)
+    collection_name = args.collection
+    metrics = Metrics(args.metrics_file)
+    if args.sync:
+        uploaded_count = sync_to_firestore(collection_name, data, args.manifest,
+                                           delete_removed=args.delete_removed, force=args.force,
+                                           batch_size=args.batch_size, max_in_flight=args.max_in_flight,
+                                           metrics=metrics)
+    else:
+        uploaded_count = upload_to_firestore(collection_name, data, batch_size=args.batch_size,
+                                             max_in_flight=args.max_in_flight, metrics=metrics)
+    
+    for line in metrics.summary():
+        logger.info(line)
+    if args.prometheus_file:
+        metrics.write_prometheus(args.prometheus_file)
+    metrics.close()
     
     logger.info("=" * 50)
     logger.info("Работа загрузчика завершена")
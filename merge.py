@@ -0,0 +1,90 @@
+"""Слияние частичных результатов шардов генерации: глобальная дедупликация и разрешение конфликтов"""
+import argparse
+import statistics
+from array import array
+from itertools import chain
+from dedupe import DEFAULT_THRESHOLD, NearDuplicateIndex
+from journal import iter_records
+from json_stream import parse_number, write_json_array
+
+FIELDS = ("Calories", "Protein", "Fat", "Carbohydrates")
+
+
+def iter_shards(paths):
+    """Продукты всех шардов подряд: журналы генерации .jsonl или JSON-массивы"""
+    return chain.from_iterable(iter_records(path) for path in paths)
+
+
+def resolve_conflict(first, values):
+    """Запись группы дубликатов: поля первой записи, калорийность и БЖУ — медианы по группе"""
+    merged = dict(first)
+    for i, field in enumerate(FIELDS):
+        column = [row[i] for row in values if row[i] is not None]
+        if not column:
+            continue
+        median = statistics.median(column)
+        if field == "Calories":
+            merged[field] = str(round(median)) if isinstance(first.get(field), str) else round(median)
+        else:
+            merged[field] = round(median, 1)
+    return merged
+
+
+def merge_records(paths, threshold=DEFAULT_THRESHOLD, on_conflict=None):
+    """Потоковое слияние шардов: по одной записи на группу почти одинаковых названий.
+
+    Шарды читаются трижды: построение индекса названий, подсчет размеров групп и выдача.
+    Одиночные записи выдаются сразу, группа из нескольких записей — когда встретился ее
+    последний член (см. resolve_conflict); on_conflict(запись, размер группы) вызывается
+    для каждой такой группы. В памяти — индекс названий, размеры групп и значения
+    незакрытых групп, а не все записи.
+    """
+    index = NearDuplicateIndex(threshold)
+    for record in iter_shards(paths):
+        if index.find_id(record["Title"]) is None:
+            index.add(record["Title"])
+
+    sizes = array('I', [0]) * len(index)
+    for record in iter_shards(paths):
+        sizes[index.find_id(record["Title"])] += 1
+
+    pending = {}
+    for record in iter_shards(paths):
+        group = index.find_id(record["Title"])
+        if sizes[group] == 1:
+            yield record
+            continue
+        first, values = pending.setdefault(group, (record, []))
+        values.append(tuple(parse_number(record.get(field)) for field in FIELDS))
+        if len(values) == sizes[group]:
+            del pending[group]
+            merged = resolve_conflict(first, values)
+            if on_conflict is not None:
+                on_conflict(merged, len(values))
+            yield merged
+
+
+def merge_shards(paths, output_path, threshold=DEFAULT_THRESHOLD, on_conflict=None):
+    """Слияние шардов в итоговый JSON-массив; возвращает количество записанных продуктов"""
+    with open(output_path, 'w', encoding='utf-8') as out:
+        return write_json_array(merge_records(paths, threshold, on_conflict), out)
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Слияние результатов шардов генерации")
+    parser.add_argument('inputs', nargs='+', help="журналы шардов (.jsonl) или JSON-массивы")
+    parser.add_argument('-o', '--output', default="food_database.json", help="итоговый JSON-файл")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="порог сходства триграмм (коэффициент Жаккара)")
+    args = parser.parse_args(argv)
+
+    conflicts = []
+    written = merge_shards(args.inputs, args.output, args.threshold,
+                           on_conflict=lambda record, size: conflicts.append((record["Title"], size)))
+    for title, size in conflicts:
+        print(f"Объединено {size} записей: {title!r}")
+    print(f"Записано {written} продуктов, объединено групп дубликатов: {len(conflicts)}. Результат: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
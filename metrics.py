@@ -0,0 +1,162 @@
+"""Метрики производительности: счетчики, гистограммы задержек, события JSONL и текстовый формат Prometheus"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин (как histogram в Prometheus)"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Оценка квантиля линейной интерполяцией внутри корзины"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+               for k, v in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+class Metrics:
+    """Потокобезопасный реестр метрик одного запуска.
+
+    Счетчики и гистограммы адресуются именем и метками (inc/observe/timer), отдельные
+    события пишутся строками JSON в events_path. В конце запуска — summary() для консоли
+    и write_prometheus() для текстового формата Prometheus.
+    """
+
+    def __init__(self, events_path=None):
+        self.counters = {}
+        self.histograms = {}
+        self.started = time.time()
+        self.lock = threading.Lock()
+        self.events = open(events_path, 'a', encoding='utf-8') if events_path else None
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Замер длительности блока в гистограмму name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def event(self, kind, **fields):
+        """Запись события строкой JSON (если задан файл событий)"""
+        if self.events is None:
+            return
+        line = json.dumps({"ts": round(time.time(), 3), "event": kind, **fields}, ensure_ascii=False)
+        with self.lock:
+            self.events.write(line + "\n")
+            self.events.flush()
+
+    def counter(self, name, **labels):
+        """Значение счетчика; без меток — сумма по всем меткам"""
+        with self.lock:
+            if labels:
+                return self.counters.get((name, _label_key(labels)), 0)
+            return sum(v for (n, _), v in self.counters.items() if n == name)
+
+    def merged(self, name):
+        """Гистограмма name, объединенная по всем меткам"""
+        result = Histogram()
+        with self.lock:
+            for (n, _), histogram in self.histograms.items():
+                if n != name:
+                    continue
+                result.counts = [a + b for a, b in zip(result.counts, histogram.counts)]
+                result.count += histogram.count
+                result.sum += histogram.sum
+        return result
+
+    def summary(self):
+        """Строки итоговой сводки: счетчики и p50/p99 по каждой гистограмме"""
+        lines = [f"Время работы: {time.time() - self.started:.1f} с"]
+        names = sorted({name for name, _ in self.counters})
+        for name in names:
+            by_label = [(key, v) for (n, key), v in sorted(self.counters.items()) if n == name]
+            parts = ", ".join(f"{_format_labels(key) or 'всего'}={v:g}" for key, v in by_label)
+            lines.append(f"{name}: {parts}")
+        for name in sorted({name for name, _ in self.histograms}):
+            h = self.merged(name)
+            lines.append(f"{name}: n={h.count}, сумма={h.sum:.2f} с, среднее={h.sum / max(h.count, 1):.4f} с, "
+                         f"p50={h.quantile(0.5):.4f} с, p99={h.quantile(0.99):.4f} с")
+        return lines
+
+    def write_prometheus(self, path):
+        """Сохранение всех метрик в текстовом формате Prometheus"""
+        out = []
+        with self.lock:
+            for name in sorted({name for name, _ in self.counters}):
+                out.append(f"# TYPE {name} counter")
+                for (n, key), value in sorted(self.counters.items()):
+                    if n == name:
+                        out.append(f"{name}{_format_labels(key)} {value:g}")
+            for name in sorted({name for name, _ in self.histograms}):
+                out.append(f"# TYPE {name} histogram")
+                for (n, key), h in sorted(self.histograms.items()):
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(list(h.buckets) + ["+Inf"], h.counts):
+                        cumulative += count
+                        out.append(f"{name}_bucket{_format_labels(key, [('le', bound)])} {cumulative}")
+                    out.append(f"{name}_sum{_format_labels(key)} {h.sum:.6f}")
+                    out.append(f"{name}_count{_format_labels(key)} {h.count}")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(out) + "\n")
+
+    def close(self):
+        if self.events is not None:
+            self.events.close()
+            self.events = None
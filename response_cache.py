@@ -0,0 +1,101 @@
+"""Постоянный кэш ответов модели на диске (SQLite)"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_FILE = ".response_cache.sqlite"
+DEFAULT_TTL = 30 * 24 * 3600  # 30 дней
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024  # 200 МБ
+
+
+def make_key(model, messages, temperature, max_tokens):
+    """Ключ кэша: хэш модели, сообщений и параметров генерации"""
+    payload = json.dumps(
+        {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens},
+        ensure_ascii=False, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """Кэш сырого message.content по ключу запроса с TTL и ограничением размера.
+
+    При refresh=True чтение из кэша отключено, но новые ответы записываются,
+    так что кэш обновляется свежими данными.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_FILE, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES, refresh=False):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.refresh = refresh
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        # WAL: один файл кэша могут одновременно использовать несколько процессов (шарды генерации)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " content TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self.conn.commit()
+
+    def get(self, key):
+        """Возвращает сохраненный ответ или None, если его нет или он устарел"""
+        if self.refresh:
+            return None
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT content, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            content, created_at = row
+            if self.ttl is not None and now - created_at > self.ttl:
+                self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.conn.commit()
+                return None
+            self.conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+        return content
+
+    def put(self, key, content):
+        """Сохранение ответа с последующим вытеснением устаревших и давно неиспользуемых записей"""
+        now = time.time()
+        size = len(content.encode('utf-8'))
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, content, size, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, content, size, now, now)
+            )
+            self._evict(now)
+            self.conn.commit()
+
+    def _evict(self, now):
+        if self.ttl is not None:
+            self.conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+        if self.max_bytes is None:
+            return
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Вытесняем записи, к которым дольше всего не обращались (LRU)
+        for key, size in self.conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        ).fetchall():
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,86 @@
+"""Приемники пакетной записи документов: Firestore и локальная замена в памяти"""
+import random
+import threading
+import time
+import uuid
+
+# Предел Firestore на количество операций записи в одном пакете
+MAX_BATCH_SIZE = 500
+
+
+class ContentionError(Exception):
+    """Временная ошибка конкуренции/перегрузки, после которой пакет можно повторить"""
+
+
+class FirestoreSink:
+    """Запись пакетов в коллекцию Firestore.
+
+    Для работы с локальным эмулятором достаточно задать переменную окружения
+    FIRESTORE_EMULATOR_HOST перед инициализацией Firebase.
+    """
+
+    def __init__(self, collection_name):
+        from firebase_admin import firestore
+        from google.api_core import exceptions
+
+        self.firestore = firestore
+        self.db = firestore.client()
+        self.collection_ref = self.db.collection(collection_name)
+        self.retryable_errors = (
+            ContentionError,
+            exceptions.Aborted,
+            exceptions.ResourceExhausted,
+            exceptions.ServiceUnavailable,
+            exceptions.DeadlineExceeded,
+        )
+
+    def commit(self, writes):
+        """Атомарная запись пакета; writes — список пар (doc_id или None, данные).
+
+        Данные None означают удаление документа doc_id.
+        """
+        batch = self.db.batch()
+        for doc_id, item in writes:
+            doc_ref = self.collection_ref.document(doc_id) if doc_id else self.collection_ref.document()
+            if item is None:
+                batch.delete(doc_ref)
+                continue
+            # Добавляем метаданные, не изменяя исходную запись
+            batch.set(doc_ref, dict(item, uploaded_at=self.firestore.SERVER_TIMESTAMP))
+        batch.commit()
+
+    def is_retryable(self, error):
+        return isinstance(error, self.retryable_errors)
+
+
+class MemorySink:
+    """Потокобезопасная замена Firestore в памяти для тестов и бенчмарков.
+
+    latency имитирует время сетевого обращения на один коммит, error_rate — долю
+    коммитов, завершающихся ошибкой конкуренции.
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.documents = {}
+        self.commits = 0
+        self.lock = threading.Lock()
+
+    def commit(self, writes):
+        """Атомарная запись пакета; writes — список пар (doc_id или None, данные), None — удаление"""
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            if self.error_rate and self.random.random() < self.error_rate:
+                raise ContentionError("Too much contention on these documents")
+            for doc_id, item in writes:
+                if item is None:
+                    self.documents.pop(doc_id, None)
+                else:
+                    self.documents[doc_id or uuid.uuid4().hex] = dict(item)
+            self.commits += 1
+
+    def is_retryable(self, error):
+        return isinstance(error, ContentionError)
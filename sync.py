@@ -0,0 +1,72 @@
+"""Инкрементальная синхронизация: стабильные ID документов, хэши содержимого и локальный манифест"""
+import hashlib
+import json
+import os
+import re
+
+DEFAULT_MANIFEST_FILE = "firestore_manifest.json"
+
+# Служебные поля, которые не влияют на содержимое записи
+IGNORED_FIELDS = ('uploaded_at',)
+
+
+def normalize_title(title):
+    """Нормализация названия для ID: регистр, ё→е, лишние пробелы"""
+    title = title.casefold().replace('ё', 'е')
+    return re.sub(r'\s+', ' ', title).strip()
+
+
+def document_id(record):
+    """Детерминированный ID документа по нормализованному названию"""
+    return hashlib.sha1(normalize_title(record["Title"]).encode('utf-8')).hexdigest()
+
+
+def content_hash(record):
+    """Хэш содержимого записи без служебных полей"""
+    payload = {k: v for k, v in record.items() if k not in IGNORED_FIELDS}
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def load_manifest(path):
+    """Манифест последней синхронизации: {doc_id: хэш содержимого}"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, path):
+    """Атомарное сохранение манифеста (через временный файл)"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def plan_sync(records, manifest, delete_removed=False, force=False):
+    """Поток операций (doc_id, запись или None для удаления) для приведения коллекции к records.
+
+    Записываются только новые и измененные записи; при delete_removed удаляются документы,
+    которых больше нет во входных данных. force=True перезаписывает все записи.
+    Из записей с совпадающим нормализованным названием учитывается первая.
+    """
+    seen = set()
+    for record in records:
+        doc_id = document_id(record)
+        if doc_id in seen:
+            continue
+        seen.add(doc_id)
+        if force or manifest.get(doc_id) != content_hash(record):
+            yield doc_id, record
+    if delete_removed:
+        for doc_id in [doc_id for doc_id in manifest if doc_id not in seen]:
+            yield doc_id, None
+
+
+def apply_committed(manifest, writes):
+    """Обновление манифеста по успешно закоммиченному пакету"""
+    for doc_id, record in writes:
+        if record is None:
+            manifest.pop(doc_id, None)
+        else:
+            manifest[doc_id] = content_hash(record)
@@ -0,0 +1,83 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from client_pool import ClientPool, backoff_delay, parse_endpoints, retry_after
+
+
+def http_error(**headers):
+    return SimpleNamespace(response=SimpleNamespace(headers=headers))
+
+
+def make_pool(keys=("k1", "k2"), **kwargs):
+    pool = ClientPool([(key, "http://api/v1") for key in keys], rate=1000.0, **kwargs)
+    for endpoint in pool.endpoints:
+        # Клиент SDK не нужен: запросы в тестах не выполняются
+        endpoint.client = object()
+    return pool
+
+
+def test_parse_endpoints():
+    assert parse_endpoints(" k1, k2@http://other/v1 ,", "http://default/v1") == [
+        ("k1", "http://default/v1"), ("k2", "http://other/v1")]
+    with pytest.raises(ValueError):
+        parse_endpoints(" , ", "http://default/v1")
+
+
+def test_retry_after_headers():
+    assert retry_after(http_error(**{"retry-after-ms": "1500"})) == 1.5
+    assert retry_after(http_error(**{"retry-after": "2"})) == 2.0
+    assert retry_after(http_error(**{"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0.0
+    assert retry_after(http_error()) is None
+    assert retry_after(ValueError()) is None
+
+
+def test_throttled_key_is_skipped_until_retry_after():
+    pool = make_pool()
+    first = pool.acquire()
+    assert pool.release(first, http_error(**{"retry-after": "60"})) is True
+    for _ in range(3):
+        endpoint = pool.acquire()
+        assert endpoint is not first
+        pool.release(endpoint)
+    assert first.state == "closed" and first.throttled == 1
+
+
+def test_breaker_opens_after_failures_and_recovers_via_probe():
+    pool = make_pool(keys=("k1", "k2"), failure_threshold=2, cooldown=0.05)
+    bad = pool.endpoints[0]
+    for _ in range(2):
+        bad.in_flight += 1
+        pool.release(bad, RuntimeError("500"))
+    assert bad.state == "open" and bad.opens == 1
+    for _ in range(3):
+        endpoint = pool.acquire()
+        assert endpoint is not bad
+        pool.release(endpoint)
+
+    time.sleep(0.06)
+    # Исправный ключ занят: пробный запрос уходит на отключенный после паузы
+    pool.endpoints[1].next_free = time.monotonic() + 60
+    probe = pool.acquire()
+    assert probe is bad and bad.state == "half_open"
+    pool.release(bad)
+    assert bad.state == "closed" and bad.opens == 0
+
+
+def test_failed_probe_reopens_with_longer_cooldown():
+    pool = make_pool(keys=("k1",), failure_threshold=1, cooldown=0.05)
+    endpoint = pool.endpoints[0]
+    endpoint.in_flight += 1
+    pool.release(endpoint, RuntimeError("500"))
+    first_until = endpoint.open_until
+    time.sleep(0.06)
+    assert pool.acquire() is endpoint and endpoint.state == "half_open"
+    pool.release(endpoint, RuntimeError("500"))
+    assert endpoint.state == "open" and endpoint.opens == 2
+    assert endpoint.open_until - first_until >= 0.1
+
+
+def test_backoff_delay_is_bounded():
+    for attempt in range(10):
+        assert 0 <= backoff_delay(attempt, base=1.0, maximum=5.0) <= 5.0
@@ -0,0 +1,37 @@
+from dedupe import NearDuplicateIndex, dedupe_records, normalize_title
+
+
+def test_normalize_title_ignores_case_yo_punctuation_and_order():
+    assert normalize_title("Ёжики, мясные") == normalize_title("мясные ежики")
+
+
+def test_finds_near_duplicates():
+    index = NearDuplicateIndex()
+    index.add("Салат Цезарь с курицей")
+    assert index.find("салат цезарь с курицей!") == "Салат Цезарь с курицей"
+    assert index.find("Цезарь с курицей") == "Салат Цезарь с курицей"
+    assert index.find("Борщ украинский") is None
+
+
+def test_numbers_must_match():
+    index = NearDuplicateIndex()
+    index.add("Молоко 1%")
+    assert "Молоко 3,2%" not in index
+    assert "молоко 1%" in index
+
+
+def test_find_id_returns_insertion_order():
+    index = NearDuplicateIndex()
+    index.add("Борщ")
+    index.add("Плов с бараниной")
+    assert index.find_id("плов с бараниной") == 1
+    assert index.find_id("Окрошка на квасе") is None
+    assert len(index) == 2
+
+
+def test_dedupe_records_keeps_first():
+    records = [{"Title": "Гречка отварная"}, {"Title": "гречка  отварная"}, {"Title": "Рис отварной"}]
+    duplicates = []
+    kept = list(dedupe_records(records, on_duplicate=lambda title, match: duplicates.append((title, match))))
+    assert [r["Title"] for r in kept] == ["Гречка отварная", "Рис отварной"]
+    assert duplicates == [("гречка  отварная", "Гречка отварная")]
@@ -0,0 +1,33 @@
+import creator
+
+
+def test_follow_ups_stop_when_model_returns_non_objects(monkeypatch):
+    calls = []
+
+    def fake_get_real_food_data(api_key, category, *args, **kwargs):
+        calls.append(category)
+        return ["Яблоко", "Груша", {"Title": 123, "Calories": 1, "Protein": 1, "Fat": 1, "Carbohydrates": 1}]
+
+    monkeypatch.setattr(creator, "get_real_food_data", fake_get_real_food_data)
+    data = creator.generate_full_database("stub-key", target_count=100, concurrency=2, rate=1000.0,
+                                          categories=["фрукты", "овощи"])
+    assert data == []
+    # Первый проход и не больше MAX_REQUESTS_PER_CATEGORY запросов на категорию
+    assert len(calls) <= 2 * creator.MAX_REQUESTS_PER_CATEGORY
+
+
+def test_follow_ups_stop_when_accept_fails(monkeypatch):
+    calls = []
+
+    def failing_items(category):
+        yield {"Title": "Яблоко", "Calories": 52, "Protein": 0.3, "Fat": 0.2, "Carbohydrates": 14}
+        raise RuntimeError("обрыв")
+
+    def fake_get_real_food_data(api_key, category, *args, **kwargs):
+        calls.append(category)
+        return failing_items(category)
+
+    monkeypatch.setattr(creator, "get_real_food_data", fake_get_real_food_data)
+    creator.generate_full_database("stub-key", target_count=100, concurrency=1, rate=1000.0,
+                                   categories=["фрукты"])
+    assert len(calls) <= creator.MAX_REQUESTS_PER_CATEGORY
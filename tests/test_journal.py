@@ -0,0 +1,36 @@
+import json
+
+from journal import Journal, iter_products
+
+
+def test_resume_after_torn_tail_keeps_new_entries(tmp_path):
+    path = str(tmp_path / "food_database.jsonl")
+    journal = Journal(path)
+    journal.add_product("a", {"Title": "X"})
+    journal.close()
+    # Сбой посреди записи: последняя строка оборвана
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"category": "a", "product": {"Titl')
+
+    journal = Journal(path, resume=True)
+    journal.add_product("b", {"Title": "Z"})
+    journal.mark_done("b")
+    journal.close()
+
+    with open(path, encoding='utf-8') as f:
+        lines = [json.loads(line) for line in f]
+    assert len(lines) == 3
+    resumed = Journal(path, resume=True)
+    resumed.close()
+    assert resumed.titles == {"X", "Z"}
+    assert resumed.done_categories == {"b"}
+    assert [p["Title"] for p in iter_products(path)] == ["X", "Z"]
+
+
+def test_resume_without_newline_in_file(tmp_path):
+    path = tmp_path / "food_database.jsonl"
+    path.write_text('{"category": "a", "pro', encoding='utf-8')
+    journal = Journal(str(path), resume=True)
+    journal.add_product("a", {"Title": "Y"})
+    journal.close()
+    assert [p["Title"] for p in iter_products(str(path))] == ["Y"]
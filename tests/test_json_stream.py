@@ -0,0 +1,82 @@
+import io
+
+import pytest
+
+from json_stream import ArrayItemParser, ResponseItemParser, iter_json_array, write_json_array
+
+
+def feed_chars(parser, text):
+    items = []
+    for char in text:
+        items.extend(parser.feed(char))
+    return items
+
+
+def test_items_split_across_chunks():
+    parser = ArrayItemParser()
+    assert feed_chars(parser, '[{"Title": "Яблоко"}, {"Title": "Груша"}]') == [{"Title": "Яблоко"},
+                                                                              {"Title": "Груша"}]
+    assert parser.finished
+    parser.close()
+
+
+def test_split_scalar_waits_for_separator():
+    parser = ArrayItemParser()
+    assert parser.feed("[1, 2.") == [1]
+    assert parser.feed("5") == []
+    assert parser.feed(", tr") == [2.5]
+    assert parser.feed("ue]") == [True]
+    assert parser.finished
+
+
+def test_close_rejects_incomplete_array():
+    parser = ArrayItemParser()
+    parser.feed('[{"a": 1}, {"b"')
+    with pytest.raises(ValueError):
+        parser.close()
+
+
+def test_non_array_input_is_rejected():
+    with pytest.raises(ValueError):
+        ArrayItemParser().feed('{"a": 1}')
+
+
+def test_response_skips_fence_before_array():
+    parser = ResponseItemParser()
+    text = 'Вот список:\n```json\n[{"Title": "Борщ"}, {"Title": "Щи"}]\n```'
+    assert feed_chars(parser, text) == [{"Title": "Борщ"}, {"Title": "Щи"}]
+    assert parser.finished
+
+
+def test_response_skips_prefix_before_nested_array():
+    parser = ResponseItemParser()
+    assert parser.feed('{"items": [{"Title": "Борщ"}]}') == [{"Title": "Борщ"}]
+    assert parser.finished
+
+
+def test_response_truncated_tail_keeps_complete_items():
+    parser = ResponseItemParser()
+    assert parser.feed('[{"Title": "Борщ"}, {"Title": "Щи"}, {"Title": "Со') == [{"Title": "Борщ"},
+                                                                                 {"Title": "Щи"}]
+    assert not parser.finished
+
+
+def test_response_ignores_trailing_prose():
+    parser = ResponseItemParser()
+    assert parser.feed('[{"Title": "Борщ"}]\nНадеюсь, это поможет! [1, 2]') == [{"Title": "Борщ"}]
+    assert parser.feed(" еще текст") == []
+    assert parser.finished
+
+
+def test_response_without_array_yields_nothing():
+    parser = ResponseItemParser()
+    assert parser.feed("Извините, не могу помочь.") == []
+    assert not parser.finished
+
+
+def test_write_and_read_roundtrip():
+    records = [{"Title": "Борщ", "Calories": "50"}, {"Title": "Щи", "Protein": 1.5}]
+    out = io.StringIO()
+    assert write_json_array(records, out) == 2
+    assert list(iter_json_array(io.StringIO(out.getvalue()), chunk_size=7)) == records
+
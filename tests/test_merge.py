@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+from json_stream import parse_number
+from merge import merge_records, merge_shards, resolve_conflict
+
+
+def write_journal(path, products):
+    with open(path, 'w', encoding='utf-8') as f:
+        for product in products:
+            f.write(json.dumps({"category": "супы", "product": product}, ensure_ascii=False) + "\n")
+    return str(path)
+
+
+def product(title, calories, protein, fat, carbs):
+    return {"Title": title, "Calories": calories, "Protein": protein, "Fat": fat, "Carbohydrates": carbs}
+
+
+def test_merge_resolves_cross_shard_duplicates_with_medians(tmp_path):
+    first = write_journal(tmp_path / "a.jsonl", [product("Борщ", "50", 2.0, 1.0, 6.0),
+                                                 product("Плов", "200", 8.0, 9.0, 25.0)])
+    second = write_journal(tmp_path / "b.jsonl", [product("борщ", "60", 3.0, 2.0, 7.0),
+                                                  product("Борщ", "70", 4.0, 3.0, 8.0)])
+    conflicts = []
+    merged = list(merge_records([first, second], on_conflict=lambda record, size: conflicts.append(size)))
+    assert merged == [product("Плов", "200", 8.0, 9.0, 25.0), product("Борщ", "60", 3.0, 2.0, 7.0)]
+    assert conflicts == [3]
+
+
+def test_merge_shards_accepts_json_arrays_and_torn_journals(tmp_path):
+    array_path = tmp_path / "a.json"
+    array_path.write_text(json.dumps([product("Щи", "30", 1.0, 1.0, 4.0)], ensure_ascii=False), encoding='utf-8')
+    journal_path = write_journal(tmp_path / "b.jsonl", [product("Окрошка", "60", 2.0, 3.0, 5.0)])
+    with open(journal_path, 'a', encoding='utf-8') as f:
+        f.write('{"category": "супы", "pro')
+    output = tmp_path / "out.json"
+    assert merge_shards([str(array_path), journal_path], str(output)) == 2
+    assert [r["Title"] for r in json.loads(output.read_text(encoding='utf-8'))] == ["Щи", "Окрошка"]
+
+
+def test_resolve_conflict_keeps_calories_type():
+    values = [(50.0, 2.0, 1.0, 6.0), (61.0, None, 2.0, 7.0)]
+    assert resolve_conflict(product("Борщ", 50, 2.0, 1.0, 6.0), values)["Calories"] == 56
+    merged = resolve_conflict(product("Борщ", "50", 2.0, 1.0, 6.0), values)
+    assert merged["Calories"] == "56" and merged["Protein"] == 2.0 and merged["Fat"] == 1.5
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("12,5", 12.5), (" 7 ", 7.0), (3, 3.0), ("н/д", None), (None, None), ("inf", None), ("nan", None),
+])
+def test_parse_number(value, expected):
+    assert parse_number(value) == expected
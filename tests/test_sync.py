@@ -0,0 +1,35 @@
+from sync import apply_committed, content_hash, document_id, plan_sync
+
+
+def test_document_id_is_stable_across_case_and_spaces():
+    assert document_id({"Title": "Борщ  Украинский"}) == document_id({"Title": "борщ украинский"})
+    assert document_id({"Title": "Ёж"}) == document_id({"Title": "еж"})
+
+
+def test_content_hash_ignores_upload_time():
+    record = {"Title": "Борщ", "Calories": "50"}
+    assert content_hash(record) == content_hash(dict(record, uploaded_at=123))
+
+
+def test_plan_sync_writes_only_new_and_changed():
+    old = {"Title": "Борщ", "Calories": "50"}
+    manifest = {}
+    apply_committed(manifest, list(plan_sync([old], manifest)))
+    changed = {"Title": "Борщ", "Calories": "55"}
+    new = {"Title": "Щи", "Calories": "30"}
+    assert list(plan_sync([old, new], manifest)) == [(document_id(new), new)]
+    assert list(plan_sync([changed], manifest)) == [(document_id(changed), changed)]
+    assert list(plan_sync([old], manifest, force=True)) == [(document_id(old), old)]
+
+
+def test_plan_sync_skips_repeated_titles_and_deletes_removed():
+    manifest = {}
+    records = [{"Title": "Борщ"}, {"Title": "борщ"}, {"Title": "Щи"}]
+    writes = list(plan_sync(records, manifest))
+    assert [record for _, record in writes] == [records[0], records[2]]
+    apply_committed(manifest, writes)
+
+    deletes = list(plan_sync([records[2]], manifest, delete_removed=True))
+    assert deletes == [(document_id(records[0]), None)]
+    apply_committed(manifest, deletes)
+    assert list(manifest) == [document_id(records[2])]
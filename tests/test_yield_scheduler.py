@@ -0,0 +1,34 @@
+from creator import YieldScheduler
+
+
+def test_next_round_orders_by_expected_yield():
+    scheduler = YieldScheduler(["a", "b", "c"], min_yield=3)
+    scheduler.record("a", ["x"] * 5)
+    scheduler.record("b", ["y"] * 12)
+    scheduler.record("c", ["z"] * 1)
+    # "c" дала меньше min_yield и в дозапросы не попадает
+    assert scheduler.next_round(10) == ["b", "a"]
+    assert scheduler.next_round(1) == ["b"]
+
+
+def test_follow_up_with_low_yield_retires_category():
+    scheduler = YieldScheduler(["a", "b"], min_yield=3)
+    scheduler.record("a", ["x"] * 10)
+    scheduler.record("b", ["y"] * 10)
+    scheduler.record("a", ["x"] * 2, follow_up=True)
+    assert "a" in scheduler.retired
+    assert scheduler.next_round(10) == ["b"]
+    assert scheduler.titles["a"] == ["x"] * 12
+
+
+def test_request_limit_retires_category():
+    scheduler = YieldScheduler(["a"], min_yield=1, max_requests=3)
+    for _ in range(3):
+        scheduler.record("a", ["x"] * 10, follow_up=True)
+    assert scheduler.next_round(10) == []
+
+
+def test_unrequested_categories_keep_initial_estimate():
+    scheduler = YieldScheduler(["a", "b"], initial_yield=15)
+    scheduler.record("a", ["x"] * 4)
+    assert scheduler.next_round(10) == ["b", "a"]
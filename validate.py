@@ -0,0 +1,192 @@
+"""Векторизованная проверка и исправление пищевой ценности по всей базе (NumPy)"""
+import argparse
+import json
+import numpy as np
+from journal import iter_records, read_entries
+from json_stream import parse_number, write_json_array
+
+FIELDS = ("Calories", "Protein", "Fat", "Carbohydrates")
+
+# Коды проблем (битовая маска)
+INVALID = 1       # значение отсутствует или не число
+OUT_OF_RANGE = 2  # отрицательные значения или больше физического предела
+MACRO_SUM = 4     # белки + жиры + углеводы больше 100 г на 100 г
+ENERGY = 8        # калорийность далека от 4·Б + 9·Ж + 4·У
+OUTLIER = 16      # выброс по калорийности внутри своей категории
+ISSUE_NAMES = {INVALID: "некорректное значение", OUT_OF_RANGE: "вне допустимого диапазона",
+               MACRO_SUM: "сумма БЖУ больше 100 г", ENERGY: "калорийность не сходится с БЖУ",
+               OUTLIER: "выброс в категории"}
+
+MAX_CALORIES = 900.0  # чистый жир ~ 900 ккал/100 г
+MAX_MACRO = 100.0
+MACRO_SUM_TOLERANCE = 2.0  # г, допуск на округление
+ENERGY_TOLERANCE = 0.2  # относительный допуск энергетического баланса
+ENERGY_SLACK = 30.0  # абсолютный допуск, ккал (клетчатка, спирты, органические кислоты)
+OUTLIER_Z = 3.5  # порог робастного z-показателя (по медиане и MAD)
+MIN_GROUP = 8  # минимальный размер категории для поиска выбросов
+
+# Исправимые проблемы: калорийность пересчитывается по БЖУ, запись сохраняется
+REPAIRABLE = ENERGY
+REJECT = INVALID | OUT_OF_RANGE | MACRO_SUM
+
+
+def iter_categorized(path):
+    """Пары (категория, запись) из JSON-массива или журнала генерации (.jsonl с категориями)"""
+    if path.endswith('.jsonl'):
+        # Оборванная последняя строка журнала (после сбоя) пропускается, как при --resume
+        for entry in read_entries(path):
+            if "product" in entry:
+                yield entry["category"], entry["product"]
+        return
+    for record in iter_records(path):
+        yield record.get("category", ""), record
+
+
+def load_columns(pairs):
+    """Колоночное представление базы.
+
+    Возвращает (коды категорий int32, названия категорий, {поле: массив float64}).
+    """
+    codes = []
+    names = {}
+    values = {field: [] for field in FIELDS}
+    for category, record in pairs:
+        codes.append(names.setdefault(category, len(names)))
+        for field in FIELDS:
+            values[field].append(parse_number(record.get(field), np.nan))
+    columns = {field: np.asarray(values[field], dtype=np.float64) for field in FIELDS}
+    return np.asarray(codes, dtype=np.int32), list(names), columns
+
+
+def validate_columns(codes, columns, outliers=True):
+    """Проверка всех записей одним векторизованным проходом.
+
+    Возвращает (flags, calories_estimate): битовую маску проблем для каждой записи
+    и калорийность, пересчитанную по БЖУ (округленную до 0.1). outliers=False
+    отключает поиск выбросов по категориям.
+    """
+    calories = columns["Calories"]
+    protein, fat, carbs = columns["Protein"], columns["Fat"], columns["Carbohydrates"]
+    stacked = np.stack([calories, protein, fat, carbs])
+    flags = np.zeros(len(calories), dtype=np.uint8)
+
+    flags[np.isnan(stacked).any(axis=0)] |= INVALID
+    with np.errstate(invalid='ignore'):
+        out_of_range = (stacked < 0).any(axis=0) | (calories > MAX_CALORIES) | \
+            (np.stack([protein, fat, carbs]) > MAX_MACRO).any(axis=0)
+        flags[out_of_range] |= OUT_OF_RANGE
+        flags[protein + fat + carbs > MAX_MACRO + MACRO_SUM_TOLERANCE] |= MACRO_SUM
+
+        estimate = np.round(4 * protein + 9 * fat + 4 * carbs, 1)
+        flags[np.abs(calories - estimate) > ENERGY_TOLERANCE * estimate + ENERGY_SLACK] |= ENERGY
+        # Нулевые БЖУ при заметной калорийности — это пропущенные данные, а не повод обнулять калории
+        flags[(estimate == 0) & (calories > ENERGY_SLACK)] |= INVALID
+
+    if outliers:
+        flags |= category_outliers(codes, calories, flags)
+    return flags, estimate
+
+
+def category_outliers(codes, calories, flags):
+    """Выбросы калорийности по робастному z-показателю внутри каждой категории"""
+    result = np.zeros(len(calories), dtype=np.uint8)
+    usable = np.flatnonzero((flags & (INVALID | OUT_OF_RANGE)) == 0)
+    # Сортировка по коду категории: каждая категория — непрерывный срез
+    order = usable[np.argsort(codes[usable], kind='stable')]
+    bounds = np.flatnonzero(np.diff(codes[order])) + 1
+    for group in np.split(order, bounds):
+        if len(group) < MIN_GROUP:
+            continue
+        values = calories[group]
+        median = np.median(values)
+        mad = np.median(np.abs(values - median))
+        if mad == 0:
+            continue
+        z = 0.6745 * np.abs(values - median) / mad
+        result[group[z > OUTLIER_Z]] = OUTLIER
+    return result
+
+
+def describe(flag):
+    return [name for code, name in ISSUE_NAMES.items() if flag & code]
+
+
+def repair_record(record, flag, estimate):
+    """Исправление записи: калорийность по БЖУ, БЖУ с точностью до 0.1 г"""
+    repaired = dict(record)
+    for field in FIELDS[1:]:
+        repaired[field] = round(parse_number(record[field], np.nan), 1)
+    if flag & REPAIRABLE:
+        calories = int(round(estimate))
+        repaired["Calories"] = str(calories) if isinstance(record["Calories"], str) else calories
+    return repaired
+
+
+def run(input_path, output_path, report_path):
+    """Проверка файла: запись исправленной базы (без отбракованных записей) и отчета"""
+    codes, names, columns = load_columns(iter_categorized(input_path))
+    # В food_database.json категорий нет: одна общая группа сравнивала бы масла с овощами
+    outliers = len(names) > 1
+    flags, estimate = validate_columns(codes, columns, outliers)
+
+    issues = []
+    kept = []
+
+    def accepted():
+        # Второй потоковый проход по файлу: в памяти только колонки, а не все записи
+        for i, (category, record) in enumerate(iter_categorized(input_path)):
+            flag = int(flags[i])
+            if flag:
+                issues.append({
+                    "Title": record.get("Title"),
+                    "category": category,
+                    "issues": describe(flag),
+                    "action": "отброшена" if flag & REJECT else ("исправлена" if flag & REPAIRABLE else "помечена"),
+                    "original": {field: record.get(field) for field in FIELDS},
+                    "estimated_calories": None if np.isnan(estimate[i]) else float(estimate[i]),
+                })
+            if flag & REJECT:
+                continue
+            kept.append(1)
+            yield repair_record(record, flag, estimate[i])
+
+    with open(output_path, 'w', encoding='utf-8') as out:
+        write_json_array(accepted(), out)
+
+    summary = {
+        "total": int(len(flags)),
+        "valid": int((flags == 0).sum()),
+        "repaired": int((((flags & REPAIRABLE) != 0) & ((flags & REJECT) == 0)).sum()),
+        "rejected": int(((flags & REJECT) != 0).sum()),
+        "written": len(kept),
+        "by_issue": {name: int(((flags & code) != 0).sum()) for code, name in ISSUE_NAMES.items()},
+        "outliers_checked": outliers,
+    }
+    if not outliers:
+        summary["note"] = ("выбросы в категориях не проверялись: в файле нет категорий "
+                           "(для этой проверки передайте журнал генерации .jsonl)")
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump({"summary": summary, "issues": issues}, f, ensure_ascii=False, indent=2)
+    return summary
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Проверка и исправление пищевой ценности в базе продуктов")
+    parser.add_argument('input', nargs='?', default="food_database.json",
+                        help="JSON-массив или журнал генерации .jsonl (с категориями)")
+    parser.add_argument('-o', '--output', default="food_database.valid.json", help="исправленная база")
+    parser.add_argument('--report', default="validation_report.json", help="отчет о проверке")
+    args = parser.parse_args(argv)
+
+    summary = run(args.input, args.output, args.report)
+    print(f"Всего записей: {summary['total']}, без замечаний: {summary['valid']}")
+    print(f"Исправлено: {summary['repaired']}, отброшено: {summary['rejected']}, записано: {summary['written']}")
+    for name, count in summary["by_issue"].items():
+        print(f"  {name}: {count}")
+    if "note" in summary:
+        print(f"Примечание: {summary['note']}")
+    print(f"Результат: {args.output}, отчет: {args.report}")
+
+
+if __name__ == "__main__":
+    main()